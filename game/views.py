@@ -151,7 +151,7 @@ def get_characters_for_world(request):
     try:
         world = GameWorld[world_value]
         characters = GamePresets.get_world_characters(world)
-        # characters: List[Tuple[GameCharacter, str]]
+        # characters: Tuple[Tuple[GameCharacter, str], ...]
         data = [{'value': c[0].name, 'label': c[1]} for c in characters]
         return JsonResponse({'characters': data})
     except Exception as e:
@@ -32,6 +32,9 @@ class AudioManager:
         }
     }
     language_dict = {'en': 'en', 'ru': 'ru', 'English': 'en', 'Russian': 'ru'}
+    # Общий для всех сессий синтезатор речи
+    __shared_tts: Optional[TextToSpeech] = None
+
     def __init__(self, session_id: int, language: str = "en"):
         """!
         @brief Инициализация менеджера аудио
@@ -43,7 +46,7 @@ class AudioManager:
         self.language = self.language_dict[language]
         self.db = DatabaseManager()
         self.dialogue_processor = DialogueProcessor(session_id)
-        self.tts = TextToSpeech()
+        self.tts = self.__get_shared_tts()
         
         # Создаем директорию для аудиофайлов сессии
         self.session_audio_dir = os.path.join("sound", str(session_id))
@@ -73,6 +76,21 @@ class AudioManager:
                 'female': ['ru-RU-Chirp3-HD-Aoede', 'ru-RU-Chirp3-HD-Kore', 'ru-RU-Chirp3-HD-Leda', 
                            'ru-RU-Chirp3-HD-Zephyr', 'ru-RU-Standard-A', 'ru-RU-Standard-C',
                            'ru-RU-Standard-E', 'ru-RU-Wavenet-A', 'ru-RU-Wavenet-C', 'ru-RU-Wavenet-E']}}
+    @classmethod
+    def __get_shared_tts(cls) -> TextToSpeech:
+        """!
+        @brief Получение общего синтезатора речи
+        
+        @details
+        Клиент Text-to-Speech создается один раз на процесс и переиспользуется
+        всеми сессиями, состояние сессии хранится в самом AudioManager.
+        
+        @return TextToSpeech Общий экземпляр синтезатора
+        """
+        if cls.__shared_tts is None:
+            cls.__shared_tts = TextToSpeech()
+        return cls.__shared_tts
+
     def _get_random_voice(self, gender: str) -> str:
         """!
         @brief Получение случайного голоса для заданного пола
@@ -153,6 +171,7 @@ class AudioManager:
         os.makedirs(temp_dir, exist_ok=True)
         
         audio_files = []
+        requests = []
         
         # Обрабатываем каждый сегмент
         for i, (speaker, text) in enumerate(segments):
@@ -174,15 +193,12 @@ class AudioManager:
 
             temp_audio_path = os.path.join(temp_dir, f"segment_{i}.mp3")
             
-            self.tts.synthesize_text(
-                text=text,
-                output_file=temp_audio_path,
-                voice_name=voice_name,
-                pitch_shift=pitch_shift,
-                filter_preset=filter_preset
-            )
+            requests.append((text, temp_audio_path, voice_name, pitch_shift, filter_preset))
             audio_files.append(temp_audio_path)
         
+        # Синтезируем все сегменты параллельно
+        self.tts.synthesize_batch(requests)
+        
         # Создаем путь для финального аудиофайла
         final_audio_path = os.path.join(self.session_audio_dir, f"{sequence_number}.mp3")
         
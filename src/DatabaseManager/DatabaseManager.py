@@ -1,10 +1,22 @@
 import sqlite3
-from typing import Optional, Dict, List, Tuple
+import threading
+from typing import Optional, Dict, List, Tuple, NamedTuple
 from datetime import datetime
 from src.config import DATABASE_NAME
 import logging
 from sqlalchemy import text
 
+class SessionInfo(NamedTuple):
+    """!
+    @brief Неизменяемые данные игровой сессии
+    """
+    world_description: str  # Описание игрового мира
+    player_description: str  # Описание игрока
+    language: str  # Язык сессии
+    initial_message: str  # Начальное сообщение персонажа на языке сессии
+    initial_message_eng: str  # Начальное сообщение персонажа на английском
+
+
 class DatabaseManager:
     """!
     @brief Менеджер базы данных для управления игровыми сессиями
@@ -21,29 +33,30 @@ class DatabaseManager:
     @note Класс использует SQLite в качестве системы управления базами данных
     """
     _instance = None
+    __instance_lock = threading.Lock()
     db_path: str
+    # Данные сессии не меняются после создания, поэтому кэшируются до ее удаления
+    __session_info_cache: Dict[int, SessionInfo]
 
     def __new__(cls) -> 'DatabaseManager':
         """!
         @brief Реализация паттерна Singleton
         
         @return DatabaseManager Единственный экземпляр класса
-        """
-        if cls._instance is None:
-            cls._instance = super(DatabaseManager, cls).__new__(cls)
-            cls._instance.db_path = DATABASE_NAME
-            cls._instance._init_database()
-        return cls._instance
 
-    def __init__(self) -> None:
-        """!
-        @brief Инициализация атрибутов экземпляра
-        
         @details
-        Устанавливает путь к базе данных и инициализирует структуру базы данных
+        Путь к базе данных задается и структура базы данных создается один раз,
+        при первом обращении; повторные вызовы DatabaseManager() только возвращают экземпляр
         """
-        self.db_path = DATABASE_NAME
-        self._init_database()
+        if cls._instance is None:
+            with cls.__instance_lock:
+                if cls._instance is None:
+                    instance = super(DatabaseManager, cls).__new__(cls)
+                    instance.db_path = DATABASE_NAME
+                    instance.__session_info_cache = {}
+                    instance._init_database()
+                    cls._instance = instance
+        return cls._instance
 
     def _init_database(self) -> None:
         """!
@@ -295,13 +308,13 @@ class DatabaseManager:
             ''', (user_id,))
             return cursor.fetchall()
 
-    def get_session_info(self, session_id: int) -> Tuple[str, str, str, str, str]:
+    def get_session_info(self, session_id: int) -> SessionInfo:
         """!
         @brief Получение информации о сессии
         
         @param session_id ID сессии
         
-        @return Tuple[str, str, str, str, str] Кортеж из:
+        @return SessionInfo Именованный кортеж из:
             - Описание игрового мира
             - Описание игрока
             - Язык сессии
@@ -309,7 +322,12 @@ class DatabaseManager:
             - Начальное сообщение персонажа на английском
             
         @throws RuntimeError если сессия не найдена
+        
+        @note Результат кэшируется, повторные запросы той же сессии не обращаются к базе данных
         """
+        cached = self.__session_info_cache.get(session_id)
+        if cached is not None:
+            return cached
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
@@ -319,9 +337,11 @@ class DatabaseManager:
             result = cursor.fetchone()
             if result is None:
                 raise RuntimeError(f"Session {session_id} not found")
-            return result
+            session_info = SessionInfo(*result)
+            self.__session_info_cache[session_id] = session_info
+            return session_info
 
-    def save_character(self, session_id: int, name: str, description: str, gender: str) -> None:
+    def save_character(self, session_id: int, name: str, description: str, gender: str) -> int:
         """!
         @brief Сохранение персонажа
         
@@ -329,6 +349,10 @@ class DatabaseManager:
         @param name Имя персонажа
         @param description Описание персонажа
         @param gender Пол персонажа
+        
+        @return int ID сохраненного персонажа
+        
+        @throws RuntimeError если не удалось сохранить персонажа
         """
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -337,19 +361,23 @@ class DatabaseManager:
                 VALUES (?, ?, ?, ?)
             ''', (session_id, name, description, gender))
             conn.commit()
+            result = cursor.lastrowid
+            if result is None:
+                raise RuntimeError("Failed to save character: no ID returned")
+            return result
 
-    def get_characters(self, session_id: int) -> List[Tuple[str, str, str]]:
+    def get_characters(self, session_id: int) -> List[Tuple[int, str, str, str]]:
         """!
         @brief Получение списка персонажей сессии
         
         @param session_id ID сессии
         
-        @return List[Tuple[str, str, str]] Список кортежей (name, description, gender)
+        @return List[Tuple[int, str, str, str]] Список кортежей (character_id, name, description, gender)
         """
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT name, description, gender FROM characters 
+                SELECT character_id, name, description, gender FROM characters 
                 WHERE session_id = ?
             ''', (session_id,))
             return cursor.fetchall()
@@ -399,6 +427,34 @@ class DatabaseManager:
             ''', (session_id, next_seq, user_input, master_output, actor_output))
             conn.commit()
 
+    def save_turn(self, session_id: int, user_input: str, response: str, master_output: str, actor_output: str) -> None:
+        """!
+        @brief Сохранение сообщений пользователя и мастера игры за один ход
+
+        @param session_id ID сессии
+        @param user_input Ввод пользователя
+        @param response Ответ системы
+        @param master_output Вывод мастера игры
+        @param actor_output Вывод актора
+
+        @details
+        Обе записи выполняются в одной транзакции, то есть с одной фиксацией на диск
+        вместо двух при вызове save_user_message и save_master_message
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO user_messages (session_id, sequence_number, user_input, response)
+                SELECT ?, COALESCE(MAX(sequence_number), 0) + 1, ?, ? FROM user_messages
+                WHERE session_id = ?
+            ''', (session_id, user_input, response, session_id))
+            cursor.execute('''
+                INSERT INTO master_messages (session_id, sequence_number, user_input, master_output, actor_output)
+                SELECT ?, COALESCE(MAX(sequence_number), 0) + 1, ?, ?, ? FROM master_messages
+                WHERE session_id = ?
+            ''', (session_id, user_input, master_output, actor_output, session_id))
+            conn.commit()
+
     def save_actor_message(self, session_id: int, master_prompt: str, actor_response: str) -> None:
         """!
         @brief Сохранение сообщения актора
@@ -439,6 +495,24 @@ class DatabaseManager:
             ''', (session_id,))
             return cursor.fetchall()
 
+    def get_dialog_history(self, session_id: int) -> List[Tuple[str, str]]:
+        """!
+        @brief Получение истории диалога одним запросом
+        
+        @param session_id ID сессии
+        
+        @return List[Tuple[str, str]] Список пар (user_input, response) в порядке следования сообщений
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT user_input, response 
+                FROM user_messages 
+                WHERE session_id = ?
+                ORDER BY sequence_number
+            ''', (session_id,))
+            return cursor.fetchall()
+
     def get_master_messages(self, session_id: int) -> List[Tuple[int, str, str, str]]:
         """!
         @brief Получение истории сообщений мастера игры
@@ -481,6 +555,7 @@ class DatabaseManager:
         
         @param session_id ID сессии
         """
+        self.__session_info_cache.pop(session_id, None)
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
@@ -648,6 +723,19 @@ class DatabaseManager:
             ''', (session_id,))
             return cursor.fetchall()
 
+    def count_image_prompts(self, session_id: int) -> int:
+        """!
+        @brief Получение количества промптов для генерации изображений
+        
+        @param session_id ID сессии
+        
+        @return int Количество сохраненных промптов сессии
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM image_prompts WHERE session_id = ?', (session_id,))
+            return int(cursor.fetchone()[0])
+
     def save_active_characters(self, session_id: int, sequence_number: int, character_ids: List[int]) -> None:
         """!
         @brief Сохранение активных персонажей для конкретного номера последовательности в сессии
@@ -735,6 +823,31 @@ class DatabaseManager:
             logging.error(f"Error getting character: {str(e)}")
             raise
 
+    def get_characters_by_ids(self, character_ids: List[int]) -> List[Tuple[int, str, str, str]]:
+        """!
+        @brief Получение информации о нескольких персонажах одним запросом
+        
+        @param character_ids Список ID персонажей
+        
+        @return List[Tuple[int, str, str, str]] Список кортежей (character_id, name, description, gender)
+        
+        @throws Exception если произошла ошибка при получении данных
+        """
+        if not character_ids:
+            return []
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                placeholders = ', '.join('?' * len(character_ids))
+                cursor.execute(
+                    f"SELECT character_id, name, description, gender FROM characters WHERE character_id IN ({placeholders})",
+                    tuple(character_ids)
+                )
+                return cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Error getting characters: {str(e)}")
+            raise
+
     def get_active_characters_ids(self, session_id: int, sequence_number: int) -> List[int]:
         """!
         @brief Получение ID активных персонажей для конкретного номера последовательности в сессии
@@ -57,8 +57,8 @@ class DialogueProcessor:
         при разметке диалогов.
         """
         characters = self.db.get_characters(self.session_id)
-        self.character_names = [char[0] for char in characters]
-        self.character_descriptions = {char[0]: char[1] for char in characters}
+        self.character_names = [char[1] for char in characters]
+        self.character_descriptions = {char[1]: char[2] for char in characters}
 
     def _analyze_errors(self, original_text: str, segments: List[Tuple[str, str]]) -> Optional[str]:
         """!
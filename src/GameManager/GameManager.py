@@ -38,12 +38,12 @@ class GameManager:
         """
         self.__session_id = session_id
         self.__db = DatabaseManager()
-        world_description, player_description, language, _, _ = self.__db.get_session_info(session_id)
+        session_info = self.__db.get_session_info(session_id)
 
-        self.__language = language
-        self.__player_description = player_description
-        self.__game_master = GameMaster(session_id,)
+        self.__language = session_info.language
+        self.__player_description = session_info.player_description
         self.__image_manager = ImageManager(session_id)
+        self.__game_master = GameMaster(session_id, image_manager=self.__image_manager)
         self.__audio_manager = AudioManager(session_id, language=self.__language)
         self.__stt = STT()
 
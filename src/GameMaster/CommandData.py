@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class CommandData:
     """!
     @brief Базовый класс для всех команд в игровой системе
@@ -12,7 +12,7 @@ class CommandData:
     """
     pass
 
-@dataclass
+@dataclass(slots=True)
 class CommandDataEnvironmentDescription(CommandData):
     """!
     @brief Команда для описания окружения
@@ -25,7 +25,7 @@ class CommandDataEnvironmentDescription(CommandData):
     """
     description: str
 
-@dataclass
+@dataclass(slots=True)
 class CommandSelectCharacter(CommandData):
     """!
     @brief Команда выбора персонажа для действия
@@ -40,7 +40,7 @@ class CommandSelectCharacter(CommandData):
     name: str
     action: str
 
-@dataclass
+@dataclass(slots=True)
 class CommandCreateCharacter(CommandData):
     """!
     @brief Команда создания нового персонажа
@@ -57,7 +57,7 @@ class CommandCreateCharacter(CommandData):
     gender: str
     description: str
 
-@dataclass
+@dataclass(slots=True)
 class CommandOffTopic(CommandData):
     """!
     @brief Команда для обработки внеигрового ввода
@@ -68,7 +68,7 @@ class CommandOffTopic(CommandData):
     """
     pass
 
-@dataclass
+@dataclass(slots=True)
 class CommandPlayerDeath(CommandData):
     """!
     @brief Команда смерти игрового персонажа
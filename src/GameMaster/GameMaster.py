@@ -1,4 +1,4 @@
-import time
+import json
 from typing import Optional, Dict, List, Tuple, Set
 from src.GameMaster.CommandData import CommandData, CommandDataEnvironmentDescription, CommandSelectCharacter, \
     CommandCreateCharacter, CommandOffTopic, CommandPlayerDeath
@@ -6,14 +6,20 @@ from src.MessageGenerator.BaseMessageGenerator import get_base_message_generator
 from src.Actor.ProtocolActor import ProtocolActor
 from src.Actor.Actor import Actor
 from src.MessageGenerator.ProtocolMessageGenerator import ProtocolMessageGenerator
-from src.GameMaster.GameMasterPromts import start_message, world_description_start, correct_formatting, \
-    character_name_start
+from src.GameMaster.GameMasterPromts import start_message, world_description_start, commands_schema, \
+    character_name_start, understood_response
 from src.Descriptions.CharacterDecription import base_character_description
 from src.Descriptions.WorldDecription import base_world_description
 from src.DatabaseManager.DatabaseManager import DatabaseManager
 from src.ImageManager.ImageManager import ImageManager
 import logging
 
+logger = logging.getLogger(__name__)
+
+# Текстовые поля команды: по схеме commands_schema это строка или null
+command_text_fields = ("name", "gender", "description", "action")
+
+
 class PlayerDeathException(Exception):
     """!
     @brief Исключение, возникающее при смерти игрового персонажа
@@ -39,12 +45,14 @@ class GameMaster:
     
     """
     def __init__(self, session_id: int,
-                 generate_character_images: bool = True) -> None:
+                 generate_character_images: bool = True,
+                 image_manager: Optional[ImageManager] = None) -> None:
         """!
         @brief Инициализация мастера игры
         
         @param session_id ID игровой сессии
         @param generate_character_images Флаг генерации изображений персонажей (опционально)
+        @param image_manager Менеджер изображений сессии (опционально, по умолчанию создается новый)
         """
         self.session_id = session_id
         self.db = DatabaseManager()
@@ -59,11 +67,9 @@ class GameMaster:
 
         self.messageGenerator: ProtocolMessageGenerator = get_base_message_generator(RequesterClass.GameMaster)
         self.characters: Dict[str, str] = {}  # name -> description
+        self._character_ids: Dict[str, int] = {}  # name -> character_id
         self.__actor = Actor(self, session_id)
-        self.__image_manager = ImageManager(session_id)
-
-        logging.basicConfig(filename='game_master.log', level=logging.INFO,
-                          format='%(asctime)s - %(message)s', filemode='a')
+        self.__image_manager = image_manager if image_manager is not None else ImageManager(session_id)
 
         formatted_character: str = \
             f'''
@@ -75,20 +81,20 @@ class GameMaster:
         
         if is_new_session:
             self.messageGenerator.add_system_message(start_message)
-            response = "Understood"
+            response = understood_response
             self.messageGenerator.add_ai_message(response)
             self.db.save_game_master_prompt(session_id, "start", start_message, response)
             
             # World description
             world_prompt = world_description_start + '\n' + self.world_description
             self.messageGenerator.add_user_message(world_prompt)
-            response = "Understood"
+            response = understood_response
             self.messageGenerator.add_system_message(response)
             self.db.save_game_master_prompt(session_id, "world", world_prompt, response)
             
             # Character description
             self.messageGenerator.add_user_message(formatted_character)
-            response = "Understood"
+            response = understood_response
             self.messageGenerator.add_system_message(response)
             self.db.save_game_master_prompt(session_id, "character", formatted_character, response)
         else:
@@ -98,15 +104,18 @@ class GameMaster:
                 self.messageGenerator.add_ai_message(model_response)
 
         # Load existing characters from database
-        for name, description, gender in self.db.get_characters(session_id):
+        for character_id, name, description, gender in self.db.get_characters(session_id):
             self.characters[name] = description
+            self._character_ids[name] = character_id
 
         # Load master message history
         master_history = self.db.get_master_messages(session_id)
+        history: List[Tuple[str, str]] = []
         for _, user_input, master_output, actor_output in master_history:
-            self.messageGenerator.add_user_message(user_input)
-            self.messageGenerator.add_ai_message(master_output)
-            self.messageGenerator.add_system_message(actor_output)
+            history.append(('user', user_input))
+            history.append(('assistant', master_output))
+            history.append(('system', actor_output))
+        self.messageGenerator.extend_history(history)
 
     def generate_answer(self, message: str) -> str:
         """!
@@ -125,8 +134,6 @@ class GameMaster:
             - With any command your answer should always be specific. For example, you can't write that you need to come to a certain person, it has to be a specific person. You can't offer an abstract artifact sword, it has to be a specific sword with specific properties. If it takes a little more words, it's not so critical.
             - If a player enters into a dialogue or performs an action, then he should get an answer, the other person should not just think or ignore it. Except in cases where he wants to ignore you for plot reasons, in which case you should indicate that he is clearly ignoring you intentionally and give a suggestion as to why this is happening.
             - Never describe what the player is doing, always react to the player's actions, especially if he asked someone a question, he should answer
-            - Never write anything in the same line where you select a command, it will break the program.
-            - Write the names of the commands exactly as they are written, including dots and other punctuation marks.
             - Never create a player character.
         '''
         commands, real_game_master_output = self.generate_instruction(message + '\n' + rules)
@@ -143,18 +150,12 @@ class GameMaster:
         self.messageGenerator.add_system_message(actor_message)
 
         # Save user and master messages
-        self.db.save_user_message(self.session_id, message, final_message)
-        self.db.save_master_message(self.session_id, message, real_game_master_output, actor_message)
+        self.db.save_turn(self.session_id, message, final_message, real_game_master_output, actor_message)
         
-        character_ids = []
-        for name in active_characters:
-            char_id = self.db.get_character_id(self.session_id, name)
-            if char_id:
-                character_ids.append(char_id)
+        character_ids = [self._character_ids[name] for name in active_characters if name in self._character_ids]
         
         # Save active characters to DB
-        image_prompts = self.db.get_image_prompts(self.session_id)
-        sequence_number = len(image_prompts)
+        sequence_number = self.db.count_image_prompts(self.session_id)
         self.db.save_active_characters(self.session_id, sequence_number, character_ids)
         
         return final_message
@@ -167,20 +168,20 @@ class GameMaster:
         
         @return Tuple[List[CommandData], str] Кортеж из списка команд и текстового вывода
         
-        @note Метод может выполнять повторные попытки генерации при некорректном формате
+        @note Ответ модели ограничен JSON-схемой команд, поэтому синтаксически он всегда корректен.
+        Повторные попытки выполняются только при смысловых ошибках (например, неизвестное имя персонажа)
         """
-        output: str = self.messageGenerator.generate(message)
+        output: str = self.messageGenerator.generate_structured(message, commands_schema)
         cnt_errore = 0
         parsed_data, error = self.validate_and_parse(output)
         while parsed_data is None:
             cnt_errore += 1
             if cnt_errore > 3:
                 raise RuntimeError(f"Too many formatting errors: {error}")
-            time.sleep(1)
 
-            logging.info(f"\n\nOutput: {output}\nError: {error}")
-            output = self.messageGenerator.generate(
-                f"Incorrect formatting. Error: {error}. Repeat using the correct.\n{correct_formatting}")
+            logger.info("\n\nOutput: %s\nError: %s", output, error)
+            output = self.messageGenerator.generate_structured(
+                f"Incorrect commands. Error: {error}. Repeat with the error fixed.", commands_schema)
             parsed_data, error = self.validate_and_parse(output)
 
         return parsed_data, output
@@ -189,30 +190,38 @@ class GameMaster:
         """!
         @brief Валидация и парсинг входного текста
         
-        @param input_text Текст для валидации и парсинга
+        @param input_text JSON-ответ модели, соответствующий схеме commands_schema
         
         @return Tuple[Optional[List[CommandData]], str] Кортеж из списка команд (или None) и сообщения об ошибке
         """
-        cleaned_text = "\n".join([line for line in input_text.splitlines() if line.strip()])
-        lines = cleaned_text.strip().split("\n")
-        i = 0
+        try:
+            commands = json.loads(input_text)["commands"]
+        except (ValueError, KeyError, TypeError) as e:
+            return None, f"Error: Invalid JSON output: {str(e)}"
+        if not isinstance(commands, list):
+            return None, "Error: 'commands' must be a list."
+
         parsed_data: List[CommandData] = []
         tmp_characters_names: List[str] = []
-        def match_command(line: str, command: str) -> bool:
-            return line.strip().lower() == command.lower() or line.strip().lower() == (command + ".").lower()
-        while i < len(lines):
-            line = lines[i].strip()
+        for command in commands:
+            if not isinstance(command, dict):
+                return None, f"Error: Command must be an object, got {json.dumps(command)}."
+            invalid_fields = [field for field in command_text_fields
+                              if command.get(field) is not None and not isinstance(command.get(field), str)]
+            if invalid_fields:
+                return None, f"Error: Fields {', '.join(invalid_fields)} must be strings."
+            command_type = command.get("type")
 
-            if match_command(line, "Create character command"):
-                if i + 3 >= len(lines):
-                    return None, "Error: Incomplete 'Create a character command.'"
-                name = lines[i + 1].strip()
-                gender = lines[i + 2].strip().lower()
+            if command_type == "create":
+                name = (command.get("name") or "").strip()
+                gender = (command.get("gender") or "").strip().lower()
+                description = (command.get("description") or "").strip()
+                if not name or not description:
+                    return None, "Error: Incomplete 'create' command."
                 if gender not in ['male', 'female']:
                     return None, f"Error: Invalid gender '{gender}'. Must be 'male' or 'female'."
                 if name in self.characters or name in tmp_characters_names:
                     return None, f"Error: Character name '{name}' already exists."
-                description = lines[i + 3].strip()
 
                 parsed_data.append(CommandCreateCharacter(
                     name=name,
@@ -220,42 +229,37 @@ class GameMaster:
                     description=description
                 ))
                 tmp_characters_names.append(name)
-                i += 4
 
-            elif match_command(line, "Select character command"):
-                if i + 2 >= len(lines):
-                    return None, "Error: Incomplete 'Select character command.'"
-                name = lines[i + 1].strip()
+            elif command_type == "select":
+                name = (command.get("name") or "").strip()
+                action = (command.get("action") or "").strip()
+                if not name or not action:
+                    return None, "Error: Incomplete 'select' command."
                 if name not in self.characters and name not in tmp_characters_names:
                     return None, f"Error: Character name '{name}' does not exist."
-                action = lines[i + 2].strip()
 
                 parsed_data.append(CommandSelectCharacter(
                     name=name,
                     action=action
                 ))
-                i += 3
 
-            elif match_command(line, "Describe environment command"):
-                if i + 1 >= len(lines):
-                    return None, "Error: Incomplete 'The command to describe the environment.'"
-                description = lines[i + 1].strip()
+            elif command_type == "env":
+                description = (command.get("description") or "").strip()
+                if not description:
+                    return None, "Error: Incomplete 'env' command."
 
                 parsed_data.append(CommandDataEnvironmentDescription(
                     description=description
                 ))
-                i += 2
 
-            elif match_command(line, "Off-topic input command"):
+            elif command_type == "off":
                 parsed_data.append(CommandOffTopic())
-                i += 1
 
-            elif match_command(line, "Player death command"):
+            elif command_type == "death":
                 parsed_data.append(CommandPlayerDeath())
-                i += 1
 
             else:
-                return None, f"Error: Unrecognized command '{line}'"
+                return None, f"Error: Unrecognized command '{command_type}'"
         if len(parsed_data) == 0:
             return None, f"Error: No commands found."
 
@@ -276,7 +280,8 @@ class GameMaster:
         for command in commands:
             if isinstance(command, CommandCreateCharacter):
                 self.characters[command.name] = command.description
-                self.db.save_character(self.session_id, command.name, command.description,command.gender)
+                self._character_ids[command.name] = self.db.save_character(
+                    self.session_id, command.name, command.description, command.gender)
                 final_output += f"A new character appears: {command.name}. {command.description}\n"
                 active_characters.add(command.name)
                 
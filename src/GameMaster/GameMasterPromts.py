@@ -1,35 +1,37 @@
 correct_formatting = '''
-You have 5 possible actions. You can use several at once (in the order in which they go chronologically), but you must follow the formatting.
+You have 5 possible actions. You can use several at once (in the order in which they go chronologically).
+Your answer is a JSON object of the form {"commands": [...]}, where each command is an object with the fields
+"type", "name", "gender", "description" and "action". Fields that are not used by the command must be null.
 
 1. Create a character:
-   Write "Create character command."
-   Next line: Character name (must be unique)
-   Next line: Character sex (must be either "male" or "female" ONLY)
-   Next line: Detailed character description (appearance, social status, worldview)
+   "type": "create"
+   "name": Character name (must be unique)
+   "gender": Character sex (must be either "male" or "female" ONLY)
+   "description": Detailed character description (appearance, social status, worldview)
    Note: This only creates the character, they don't perform any actions yet.
 
 2. Select existing character:
-   Write "Select character command."
-   Next line: Character name
-   Next line: Character's intended action or dialogue direction (max 20 words)
+   "type": "select"
+   "name": Character name
+   "action": Character's intended action or dialogue direction (max 20 words)
    Note: This makes the character perform an action or speak.
 
 3. Describe environment:
-   Write "Describe environment command."
-   Next line: Environment description (max 30 words)
+   "type": "env"
+   "description": Environment description (max 30 words)
 
 4. Handle off-topic input:
-   Write "Off-topic input command."
+   "type": "off"
 
 5. Handle player death:
-   Write "Player death command."
+   "type": "death"
    Note: This command can only be used when the player character has died.
    This will end the session and block further input.
 
 Rules for handling different types of input:
 
 1. Off-topic input (code requests, empty input, random characters):
-   - Use "Off-topic input command"
+   - Use the "off" command
    - Mark for error image generation
 
 2. World-rule violations (flying, mind reading):
@@ -95,5 +97,31 @@ character_name_start = '''
 Here is the player character's name and description. Remember, you cannot describe events from the player's perspective - the player controls their own actions. If you understand, respond with "Understood".
 '''
 
+understood_response = 'Understood'
+
 off_topic_message_eng = 'Input is off-topic'
 off_topic_message_ru = 'Ввод не по теме'
+
+
+commands_schema = {
+    "type": "object",
+    "properties": {
+        "commands": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string", "enum": ["create", "select", "env", "off", "death"]},
+                    "name": {"type": ["string", "null"]},
+                    "gender": {"type": ["string", "null"], "enum": ["male", "female", None]},
+                    "description": {"type": ["string", "null"]},
+                    "action": {"type": ["string", "null"]}
+                },
+                "required": ["type", "name", "gender", "description", "action"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["commands"],
+    "additionalProperties": False
+}
@@ -1,9 +1,14 @@
-from enum import Enum, auto
-from typing import Dict, List, Tuple, Optional
+from enum import IntEnum, auto
+from functools import cache
+from types import MappingProxyType
+from typing import Dict, List, Tuple, Optional, FrozenSet, Mapping
 from dataclasses import dataclass
 
+# Языки сессий, для которых у каждого персонажа есть начальное сообщение
+supported_languages = ('English', 'Russian')
 
-@dataclass
+
+@dataclass(slots=True)
 class WorldInfo:
     """!
     @brief Информация о игровом мире
@@ -16,7 +21,7 @@ class WorldInfo:
     available_characters: List['GameCharacter']
 
 
-@dataclass
+@dataclass(slots=True)
 class CharacterInfo:
     """!
     @brief Информация о персонаже
@@ -29,15 +34,22 @@ class CharacterInfo:
     short_description: str
     initial_messages: Dict[str, str]
 
+    def __post_init__(self) -> None:
+        """!
+        @brief Заполнение отсутствующих переводов начального сообщения английским вариантом
+        """
+        for language in supported_languages:
+            self.initial_messages.setdefault(language, self.initial_messages["English"])
+
 
-class GameWorld(Enum):
+class GameWorld(IntEnum):
     """!
     @brief Перечисление доступных игровых миров
     """
     FANTASY = auto()
 
 
-class GameCharacter(Enum):
+class GameCharacter(IntEnum):
     """!
     @brief Перечисление доступных персонажей
     """
@@ -53,7 +65,7 @@ class GamePresets:
     @details
     Управляет доступными мирами и персонажами, их описаниями и взаимосвязями
     """
-    __worlds: Dict[GameWorld, WorldInfo] = {
+    __worlds: Mapping[GameWorld, WorldInfo] = MappingProxyType({
         GameWorld.FANTASY: WorldInfo(
             description='''
             Imagine a world where magic and chivalry coexist with the dangers of the wild and the intrigues of human kingdoms. In this world:
@@ -75,9 +87,9 @@ class GamePresets:
                 GameCharacter.archer
             ]
         )
-    }
+    })
 
-    __characters: Dict[GameCharacter, CharacterInfo] = {
+    __characters: Mapping[GameCharacter, CharacterInfo] = MappingProxyType({
         # Fantasy characters
         GameCharacter.mercenary: CharacterInfo(
             description= 
@@ -107,6 +119,11 @@ class GamePresets:
                 "English": "You arrive in the city of Voltung, recently the god of hunting has not been kind to you and you decided to look for a job in the city."
             }
         )
+    })
+
+    # Множества персонажей каждого мира для проверки принадлежности за O(1)
+    __world_characters_sets: Dict[GameWorld, FrozenSet[GameCharacter]] = {
+        world: frozenset(info.available_characters) for world, info in __worlds.items()
     }
 
     @classmethod
@@ -132,16 +149,20 @@ class GamePresets:
         return cls.__worlds[world].short_description
 
     @classmethod
-    def get_world_characters(cls, world: GameWorld) -> List[Tuple[GameCharacter, str]]:
+    @cache
+    def get_world_characters(cls, world: GameWorld) -> Tuple[Tuple[GameCharacter, str], ...]:
         """!
         @brief Получение списка персонажей для мира с их краткими описаниями
         
         @param world Игровой мир
         
-        @return List[Tuple[GameCharacter, str]] Список кортежей (персонаж, краткое описание)
+        @return Tuple[Tuple[GameCharacter, str], ...] Кортеж пар (персонаж, краткое описание)
+        
+        @details
+        Результат вычисляется один раз для каждого мира и далее берется из кэша
         """
-        return [(char, cls.__characters[char].short_description) 
-                for char in cls.__worlds[world].available_characters]
+        return tuple((char, cls.__characters[char].short_description)
+                     for char in cls.__worlds[world].available_characters)
 
     @classmethod
     def get_character_description(cls, character: GameCharacter) -> str:
@@ -175,16 +196,24 @@ class GamePresets:
         
         @return str Начальное сообщение персонажа
         """
-        return cls.__characters[character].initial_messages.get(language, cls.__characters[character].initial_messages["English"])
+        initial_messages = cls.__characters[character].initial_messages
+        try:
+            return initial_messages[language]
+        except KeyError:
+            return initial_messages["English"]
 
     @classmethod
-    def get_all_worlds(cls) -> List[Tuple[GameWorld, str]]:
+    @cache
+    def get_all_worlds(cls) -> Tuple[Tuple[GameWorld, str], ...]:
         """!
         @brief Получение списка всех доступных миров с их краткими описаниями
         
-        @return List[Tuple[GameWorld, str]] Список кортежей (мир, краткое описание)
+        @return Tuple[Tuple[GameWorld, str], ...] Кортеж пар (мир, краткое описание)
+        
+        @details
+        Результат вычисляется один раз и далее берется из кэша
         """
-        return [(world, info.short_description) for world, info in cls.__worlds.items()]
+        return tuple((world, info.short_description) for world, info in cls.__worlds.items())
 
     @classmethod
     def is_character_in_world(cls, character: GameCharacter, world: GameWorld) -> bool:
@@ -196,4 +225,4 @@ class GamePresets:
         
         @return bool True если персонаж принадлежит миру, False в противном случае
         """
-        return character in cls.__worlds[world].available_characters 
\ No newline at end of file
+        return character in cls.__world_characters_sets[world] 
\ No newline at end of file
@@ -1,13 +1,14 @@
 import os
-from typing import Optional, Any, List
+import mimetypes
+from typing import Optional, Any, List, Set, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from google import genai  # type: ignore
 from google.genai import types  # type: ignore
-from dotenv import load_dotenv
 import logging
 from PIL import Image
 from io import BytesIO
 from src.ImageGenerator.ImageGeneratorProtocol import ImageGeneratorProtocol
-from src.config import IMAGE_OUTPUT_DIR
+from src.config import IMAGE_OUTPUT_DIR, load_environment
 
 
 class ImageGeneratorGoogle(ImageGeneratorProtocol):
@@ -21,6 +22,16 @@ class ImageGeneratorGoogle(ImageGeneratorProtocol):
     
     @note Требуется прокси/vpn для работы с Google API
     """
+    __shared_client: Any = None  # Общий для всех сессий клиент Gemini API
+    __prepared_dirs: Set[str] = set()  # Уже созданные директории вывода сессий
+    # Пул потоков для параллельного чтения изображений персонажей
+    __loader_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ImageLoader")
+    # Расширения файлов, в которые данные каждого MIME-типа можно записать без перекодирования
+    __mime_extensions: Dict[str, Tuple[str, ...]] = {
+        'image/png': ('.png',),
+        'image/jpeg': ('.jpg', '.jpeg'),
+        'image/webp': ('.webp',),
+    }
     __client: Any  # Using Any for google.genai.Client since it lacks type stubs
     __output_dir: str
 
@@ -30,25 +41,54 @@ class ImageGeneratorGoogle(ImageGeneratorProtocol):
         
         @param session_id ID сессии для организации файлов изображений
         """
-        load_dotenv()
-        
         # Initialize Gemini API
-        self.__client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.__client = self.__get_shared_client()
         
-        # Set up output directory
+        # Set up output directory (once per session and process)
         self.__output_dir = os.path.join(IMAGE_OUTPUT_DIR, str(session_id))
-        os.makedirs(self.__output_dir, exist_ok=True)
+        if self.__output_dir not in self.__prepared_dirs:
+            os.makedirs(self.__output_dir, exist_ok=True)
+            self.__prepared_dirs.add(self.__output_dir)
 
-    def __save_image(self, image_data: bytes, target_path: str) -> Optional[str]:
+    @classmethod
+    def __get_shared_client(cls) -> Any:
+        """!
+        @brief Получение общего клиента Gemini API
+        
+        @details
+        Клиент создается один раз на процесс и переиспользуется всеми сессиями,
+        для каждой сессии хранится только директория вывода.
+        
+        @return Any Клиент google.genai.Client
+        """
+        if cls.__shared_client is None:
+            load_environment()
+            cls.__shared_client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        return cls.__shared_client
+
+    def __save_image(self, image_data: bytes, target_path: str, mime_type: Optional[str] = None) -> Optional[str]:
         """!
         @brief Сохранение изображения в файл
         
         @param image_data Бинарные данные изображения
         @param target_path Путь для сохранения файла
+        @param mime_type MIME-тип полученных данных (опционально)
         
         @return Optional[str] Путь к сохраненному файлу или None в случае ошибки
+        
+        @details
+        Если формат данных совпадает с расширением файла, байты записываются напрямую,
+        иначе изображение перекодируется через PIL.
         """
         try:
+            # Write the bytes as is when no format conversion is needed
+            extension = os.path.splitext(target_path)[1].lower()
+            if mime_type is not None and extension in self.__mime_extensions.get(mime_type, ()):
+                with open(target_path, 'wb') as file:
+                    file.write(image_data)
+                logging.info(f"Successfully saved image to {target_path}")
+                return target_path
+
             # Convert the image data to a PIL Image
             image = Image.open(BytesIO(image_data))
             
@@ -62,6 +102,26 @@ class ImageGeneratorGoogle(ImageGeneratorProtocol):
             logging.error(f"Error saving image: {str(e)}")
             return None
 
+    @staticmethod
+    def __load_character_image(image_path: str) -> Optional[Any]:
+        """!
+        @brief Загрузка изображения персонажа
+        
+        @param image_path Путь к изображению персонажа
+        
+        @return Optional[Any] Часть запроса types.Part с байтами изображения или None в случае ошибки
+        
+        @details
+        Файл передается в Gemini как есть, без декодирования через PIL
+        """
+        try:
+            mime_type = mimetypes.guess_type(image_path)[0] or 'image/png'
+            with open(image_path, 'rb') as file:
+                return types.Part.from_bytes(data=file.read(), mime_type=mime_type)
+        except Exception as e:
+            logging.warning(f"Failed to load character image {image_path}: {str(e)}")
+            return None
+
     def generate_image_response(self, prompt: str, target_path: str, character_images: Optional[List[str]] = None) -> Optional[str]:
         """!
         @brief Генерация изображения с использованием Gemini API
@@ -76,17 +136,14 @@ class ImageGeneratorGoogle(ImageGeneratorProtocol):
             # Prepare contents list with prompt and images
             contents: List[Any] = [prompt]
             
-            # Add character images if provided
+            # Add character images if provided, reading them in parallel
             if character_images:
-                for image_path in character_images:
-                    try:
-                        image = Image.open(image_path)
+                for image in self.__loader_executor.map(self.__load_character_image, character_images):
+                    if image is not None:
                         contents.append(image)
-                    except Exception as e:
-                        logging.warning(f"Failed to load character image {image_path}: {str(e)}")
             
-            # Generate the image using Gemini API
-            response = self.__client.models.generate_content(
+            # Generate the image using Gemini API, streaming the response
+            stream = self.__client.models.generate_content_stream(
                 model='gemini-2.0-flash-exp-image-generation',
                 contents=contents,
                 config=types.GenerateContentConfig(
@@ -94,10 +151,13 @@ class ImageGeneratorGoogle(ImageGeneratorProtocol):
                 )
             )
             
-            # Process the response
-            for part in response.candidates[0].content.parts:
-                if part.inline_data is not None:
-                    return self.__save_image(part.inline_data.data, target_path)
+            # Save the first image part as soon as it arrives, the rest of the response is not needed
+            for chunk in stream:
+                if not chunk.candidates or chunk.candidates[0].content is None:
+                    continue
+                for part in chunk.candidates[0].content.parts or []:
+                    if part.inline_data is not None:
+                        return self.__save_image(part.inline_data.data, target_path, part.inline_data.mime_type)
                     
             logging.error("No image data found in response")
             return None
@@ -1,7 +1,8 @@
 import os
 import shutil
-from typing import Optional, Any, List
+from typing import Optional, Any, List, Dict
 import logging
+from PIL import Image
 from src.DatabaseManager.DatabaseManager import DatabaseManager
 from src.ImageGenerator.ImageGeneratorProtocol import ImageGeneratorProtocol
 from src.ImageGenerator.ImageGeneratorGoogle import ImageGeneratorGoogle
@@ -10,6 +11,13 @@ from src.GameMaster.GameMasterPromts import off_topic_message_eng, off_topic_mes
 from src.config import IMAGE_OUTPUT_DIR
 
 error_image_path = 'src/ImageManager/error.png'
+reference_thumbnail_size = (512, 512)
+portrait_style = "The style is Gloomy classical painting style with dramatic chiaroscuro, muted dark tones " \
+                 "(charcoal black, deep navy, antique gold), Baroque/Romantic-era aesthetics, weathered oil texture, " \
+                 "cracked varnish aging, somber atmospheric lighting, Goya-esque melancholy, Caravaggio-inspired " \
+                 "contrasts, Turner-like stormy ambiance, haunting ethereal undertones, detailed brushwork on " \
+                 "textures (stone, fabric), cold palette with crimson accents, gothic decay motifs, and misty " \
+                 "spectral ambiance."
 
 class ImageManager:
     """!
@@ -37,6 +45,9 @@ class ImageManager:
         self.__db = DatabaseManager()
         self.__image_generator = ImageGeneratorGoogle(session_id)
         self.__prompt_generator = ImagePromptGenerator(session_id)
+        self.__image_count = self.__db.count_image_prompts(session_id)  # Число сохраненных промптов сессии
+        self.__character_names: Dict[int, str] = {}  # character_id -> name
+        self.__character_portraits: Dict[int, str] = {}  # character_id -> путь к найденному портрету
 
     def generate_character_portrait(self, character_name: str, character_description: str) -> Optional[str]:
         """!
@@ -53,16 +64,85 @@ class ImageManager:
             os.makedirs(character_dir, exist_ok=True)
             
             # Create prompt for character portrait
-            prompt = f"Create a portrait of {character_name}. {character_description}. The character should be centered on a neutral background. The style is Gloomy classical painting style with dramatic chiaroscuro, muted dark tones (charcoal black, deep navy, antique gold), Baroque/Romantic-era aesthetics, weathered oil texture, cracked varnish aging, somber atmospheric lighting, Goya-esque melancholy, Caravaggio-inspired contrasts, Turner-like stormy ambiance, haunting ethereal undertones, detailed brushwork on textures (stone, fabric), cold palette with crimson accents, gothic decay motifs, and misty spectral ambiance."
+            prompt = f"Create a portrait of {character_name}. {character_description}. The character should be centered on a neutral background. {portrait_style}"
             
             # Generate image
             image_path = os.path.join(character_dir, f"{character_name}.png")
-            return self.__image_generator.generate_image_response(prompt, image_path)
+            saved_path = self.__image_generator.generate_image_response(prompt, image_path)
+            if saved_path:
+                self.__save_reference_thumbnail(saved_path, os.path.join(character_dir, f"{character_name}.thumb.jpg"))
+            return saved_path
                 
         except Exception as e:
             logging.error(f"Error generating character portrait: {str(e)}")
             return None
 
+    @staticmethod
+    def __save_reference_thumbnail(image_path: str, thumbnail_path: str) -> None:
+        """!
+        @brief Сохранение уменьшенной копии портрета для передачи в генератор сцен
+        
+        @param image_path Путь к полноразмерному портрету
+        @param thumbnail_path Путь для сохранения уменьшенной копии
+        
+        @details
+        Копия не больше reference_thumbnail_size и сжата в JPEG, поэтому в каждый запрос
+        генерации сцены уходит меньше данных. При ошибке используется исходный портрет.
+        """
+        try:
+            with Image.open(image_path) as image:
+                image.thumbnail(reference_thumbnail_size)
+                image.convert("RGB").save(thumbnail_path, "JPEG", quality=85)
+        except Exception as e:
+            logging.warning(f"Failed to save portrait thumbnail {thumbnail_path}: {str(e)}")
+
+    def invalidate_character(self, character_id: int) -> None:
+        """!
+        @brief Сброс закэшированных данных персонажа
+        
+        @param character_id ID персонажа
+        
+        @details
+        Вызывается при изменении имени или портрета персонажа, чтобы следующая сцена
+        заново получила их из базы данных и файловой системы.
+        """
+        self.__character_names.pop(character_id, None)
+        self.__character_portraits.pop(character_id, None)
+
+    def __get_character_portraits(self, character_ids: List[int]) -> List[str]:
+        """!
+        @brief Получение путей к портретам персонажей сцены
+        
+        @param character_ids Список ID персонажей, участвующих в сцене
+        
+        @return List[str] Пути к существующим портретам в порядке character_ids
+        
+        @details
+        Имена и найденные портреты кэшируются на время сессии: база данных запрашивается
+        только для новых персонажей, а директория портретов просматривается,
+        только если для кого-то из персонажей портрет еще не найден.
+        """
+        unknown_ids = [char_id for char_id in character_ids if char_id not in self.__character_names]
+        if unknown_ids:
+            for char_id, name, _, _ in self.__db.get_characters_by_ids(unknown_ids):
+                self.__character_names[char_id] = name
+
+        missing_ids = [char_id for char_id in character_ids
+                       if char_id in self.__character_names and char_id not in self.__character_portraits]
+        character_dir = os.path.join(IMAGE_OUTPUT_DIR, str(self.__session_id), "characters")
+        if missing_ids and os.path.isdir(character_dir):
+            with os.scandir(character_dir) as entries:
+                existing_files = {entry.name for entry in entries}
+            for char_id in missing_ids:
+                # Prefer the reduced copy of the portrait when it exists
+                name = self.__character_names[char_id]
+                for file_name in (f"{name}.thumb.jpg", f"{name}.png"):
+                    if file_name in existing_files:
+                        self.__character_portraits[char_id] = os.path.join(character_dir, file_name)
+                        break
+
+        return [self.__character_portraits[char_id] for char_id in character_ids if char_id in self.__character_portraits]
+
     def generate_and_save_image(self, user_input: str, actor_output: str, character_ids: List[int]) -> Optional[str]:
         """!
         @brief Генерация и сохранение изображения сцены
@@ -75,33 +155,23 @@ class ImageManager:
         """
         if actor_output in [off_topic_message_ru, off_topic_message_eng]:
             self.__db.save_image_prompt(self.__session_id, user_input, actor_output, off_topic_message_eng)
-            image_prompts = self.__db.get_image_prompts(self.__session_id)
-            next_sequence = len(image_prompts)            
+            self.__image_count += 1
 
-            target_path = f"{IMAGE_OUTPUT_DIR}/{self.__session_id}/{next_sequence}.png"
+            target_path = f"{IMAGE_OUTPUT_DIR}/{self.__session_id}/{self.__image_count}.png"
             shutil.copy2(error_image_path, target_path)
             
             return target_path
 
         # Generate prompt with character information
         image_prompt = self.__prompt_generator.generate_prompt(user_input, actor_output, character_ids)
+        if image_prompt is None:
+            return None
         
-        # Get the next sequence number from database
-        image_prompts = self.__db.get_image_prompts(self.__session_id)
-        next_sequence = len(image_prompts)
+        # The prompt generator saved the prompt, so the next sequence number is the new count
+        self.__image_count += 1
         
-        # Get character image paths
-        character_images = []
-        for char_id in character_ids:
-            character = self.__db.get_character(char_id)
-            if character:
-                name, _ = character
-                char_image_path = os.path.join(IMAGE_OUTPUT_DIR, str(self.__session_id), "characters", f"{name}.png")
-                if os.path.exists(char_image_path):
-                    character_images.append(char_image_path)
+        character_images = self.__get_character_portraits(character_ids)
         
         # Generate and save image
-        target_path = os.path.join(IMAGE_OUTPUT_DIR, str(self.__session_id), f"{next_sequence}.png")
-        if image_prompt is None:
-            return None
-        return self.__image_generator.generate_image_response(image_prompt, target_path, character_images) 
\ No newline at end of file
+        target_path = os.path.join(IMAGE_OUTPUT_DIR, str(self.__session_id), f"{self.__image_count}.png")
+        return self.__image_generator.generate_image_response(image_prompt, target_path, character_images)
@@ -5,28 +5,15 @@ from src.Descriptions.WorldDecription import base_world_description
 import logging
 
 
-class ImagePromptGenerator:
-    """!
-    @brief Генератор промптов для создания изображений
-    
-    @details
-    Класс отвечает за:
-    - Создание детальных промптов для генерации изображений
-    - Поддержание согласованности описаний персонажей
-    - Учет контекста сцены и действий
-    - Генерацию стилистически согласованных описаний
-    """
-    def __init__(self, session_id: int) -> None:
-        """!
-        @brief Инициализация генератора промптов
-        
-        @param session_id ID сессии для организации промптов
-        """
-        self.__session_id = session_id
-        self.__messageGenerator = get_base_message_generator(RequesterClass.ImagePromter)
-        self.__db = DatabaseManager()
-        
-        start_message = f'''
+# Шаблон запроса к модели и неизменяемые части итогового промпта изображения
+scene_prompt_template = "Don't describe the scenes of cruelty too colorfully. Scene description: {scene} \n\n " \
+                        "It is character description image generation model also has this description " \
+                        "and images of these characters: {characters}"
+reference_images_note = "\n\nImages of these characters are attached for reference. In the same order"
+censorship_note = "You can censor violent scenes if they don't comply with company policy."
+
+# Системный промпт одинаков для всех сессий, поэтому формируется один раз при импорте
+start_message = f'''
         You are an expert at creating detailed image generation prompts. Your task is to create a prompt that will generate an image showing the final state of a scene after described events.
 
         World Description:
@@ -75,11 +62,35 @@ class ImagePromptGenerator:
         Format your response as a single, detailed prompt without any additional text or explanations.
         '''
 
+
+class ImagePromptGenerator:
+    """!
+    @brief Генератор промптов для создания изображений
+    
+    @details
+    Класс отвечает за:
+    - Создание детальных промптов для генерации изображений
+    - Поддержание согласованности описаний персонажей
+    - Учет контекста сцены и действий
+    - Генерацию стилистически согласованных описаний
+    """
+    def __init__(self, session_id: int) -> None:
+        """!
+        @brief Инициализация генератора промптов
+        
+        @param session_id ID сессии для организации промптов
+        """
+        self.__session_id = session_id
+        self.__messageGenerator = get_base_message_generator(RequesterClass.ImagePromter)
+        self.__db = DatabaseManager()
+        
         # Load existing image prompts from database
         image_prompts = self.__db.get_image_prompts(session_id)
+        history = []
         for _, user_input, narrative_response, image_prompt in image_prompts:
-            self.__messageGenerator.add_user_message(f"User's action: {user_input}\nScene description: {narrative_response}")
-            self.__messageGenerator.add_ai_message(image_prompt)
+            history.append(('user', f"User's action: {user_input}\nScene description: {narrative_response}"))
+            history.append(('assistant', image_prompt))
+        self.__messageGenerator.extend_history(history)
 
         # Add the start message
         self.__messageGenerator.add_system_message(start_message)
@@ -96,25 +107,17 @@ class ImagePromptGenerator:
         """
         try:
             # Get character information from database
-            character_info = []
-            for char_id in character_ids:
-                character = self.__db.get_character(char_id)
-                if character:
-                    name, description = character
-                    character_info.append(f"{name}: {description}")
+            character_info = [f"{name}: {description}"
+                              for _, name, description, _ in self.__db.get_characters_by_ids(character_ids)]
             
             # Construct the prompt with character information
             character_section = ""
             if character_info:
                 character_section = "\n\nCharacter information:\n" + "\n".join(character_info)
             
-            prompt = self.__messageGenerator.generate(
-                f'''Don't describe the scenes of cruelty too colorfully. Scene description: {system_output} 
-                \n It is character description image generation model also has this description and images of these characters: {character_section}''')
-            character_section += "\n\nImages of these characters are attached for reference. In the same order"
-
-            prompt += character_section
-            prompt += "You can censor violent scenes if they don't comply with company policy."
+            model_prompt = self.__messageGenerator.generate(
+                scene_prompt_template.format_map({'scene': system_output, 'characters': character_section}))
+            prompt = "".join((model_prompt, character_section, reference_images_note, censorship_note))
             
             # Save the prompt to database
             self.__db.save_image_prompt(self.__session_id, user_input, system_output, prompt)
@@ -0,0 +1,37 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from src.config import LOG_FILE
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """!
+    @brief Настройка логирования приложения
+    
+    @param level Уровень логирования (по умолчанию INFO)
+    
+    @details
+    Подключает к корневому логгеру QueueHandler, а запись в файл LOG_FILE
+    выполняет QueueListener в отдельном потоке, поэтому вызовы логгера
+    не блокируются на дисковом вводе-выводе.
+    Повторные вызовы ничего не делают.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    file_handler = logging.FileHandler(LOG_FILE, mode='a')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, file_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -1,6 +1,8 @@
 from src.MessageGenerator.MessageGeneratorTransformers import MessageGeneratorTransformers
 from src.MessageGenerator.MessageGeneratorOpenRouter import MessageGeneratorOpenRouter
+from src.MessageGenerator.ProtocolMessageGenerator import ProtocolMessageGenerator
 from enum import Enum, auto
+from typing import Callable, Dict
 
 class RequesterClass(Enum):
     Base = auto()
@@ -12,19 +14,16 @@ class RequesterClass(Enum):
 
 
 
-def get_base_message_generator(requester: RequesterClass = RequesterClass.Base):
-    
-    if requester == RequesterClass.Base:
-        return MessageGeneratorOpenRouter()
-    if requester == RequesterClass.GameMaster:
-        return MessageGeneratorOpenRouter()
-    if requester == RequesterClass.Actor:
-        return MessageGeneratorOpenRouter()
-    if requester == RequesterClass.ImagePromter:
-        return MessageGeneratorOpenRouter()
-    if requester == RequesterClass.DialogProcessor:
-        return MessageGeneratorOpenRouter()
-    if requester == RequesterClass.Tester:
-        return MessageGeneratorOpenRouter()
-    
-    return MessageGeneratorOpenRouter()
+# Класс генератора сообщений для каждого потребителя; отсутствующие берут OpenRouter
+_GENERATOR_REGISTRY: Dict[RequesterClass, Callable[[], ProtocolMessageGenerator]] = {
+    RequesterClass.Base: MessageGeneratorOpenRouter,
+    RequesterClass.GameMaster: MessageGeneratorOpenRouter,
+    RequesterClass.Actor: MessageGeneratorOpenRouter,
+    RequesterClass.ImagePromter: MessageGeneratorOpenRouter,
+    RequesterClass.DialogProcessor: MessageGeneratorOpenRouter,
+    RequesterClass.Tester: MessageGeneratorOpenRouter,
+}
+
+
+def get_base_message_generator(requester: RequesterClass = RequesterClass.Base) -> ProtocolMessageGenerator:
+    return _GENERATOR_REGISTRY.get(requester, MessageGeneratorOpenRouter)()
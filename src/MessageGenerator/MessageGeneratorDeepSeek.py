@@ -1,8 +1,13 @@
 import os
-from dotenv import load_dotenv
-from typing import Optional, List, Dict
-from src.MessageGenerator.ProtocolMessageGenerator import ProtocolMessageGenerator
-from openai import OpenAI
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+from src.MessageGenerator.ProtocolMessageGenerator import ProtocolMessageGenerator, Message, messages_to_dicts, \
+    schema_instruction_message
+import httpx
+from openai import OpenAI, DefaultHttpxClient
+from src.config import load_environment
+
+# Размер пула HTTP-соединений общего клиента
+connection_limits = httpx.Limits(max_connections=100, max_keepalive_connections=100)
 
 
 class MessageGeneratorDeepSeek(ProtocolMessageGenerator):
@@ -13,8 +18,9 @@ class MessageGeneratorDeepSeek(ProtocolMessageGenerator):
     Реализует интерфейс ProtocolMessageGenerator для генерации сообщений
     через DeepSeek API, предоставляющий доступ к специализированным языковым моделям.
     """
+    __shared_client: Optional[OpenAI] = None  # Общий для всех экземпляров клиент с пулом соединений
     __client: OpenAI
-    __messages: List[Dict[str, str]]
+    __messages: List[Message]
     __model: str
 
     def __init__(self, model: str = 'deepseek-chat') -> None:
@@ -23,11 +29,27 @@ class MessageGeneratorDeepSeek(ProtocolMessageGenerator):
         
         @param model Название модели для генерации (по умолчанию 'deepseek-chat')
         """
-        load_dotenv()
-        self.__client = OpenAI(api_key=os.getenv("DeepSeek_API_KEY"), base_url="https://api.deepseek.com")
+        self.__client = self.__get_shared_client()
         self.__messages = []
         self.__model = model
 
+    @classmethod
+    def __get_shared_client(cls) -> OpenAI:
+        """!
+        @brief Получение общего клиента DeepSeek API
+        
+        @details
+        Клиент создается один раз на процесс, поэтому все генераторы используют
+        один пул HTTP-соединений с keep-alive вместо нового подключения на каждый экземпляр.
+        
+        @return OpenAI Общий клиент
+        """
+        if cls.__shared_client is None:
+            load_environment()
+            cls.__shared_client = OpenAI(api_key=os.getenv("DeepSeek_API_KEY"), base_url="https://api.deepseek.com",
+                                         http_client=DefaultHttpxClient(limits=connection_limits))
+        return cls.__shared_client
+
     def generate(self, input_message: str, model: Optional[str] = None) -> str:
         """!
         @brief Генерация ответа с использованием DeepSeek API
@@ -42,7 +64,7 @@ class MessageGeneratorDeepSeek(ProtocolMessageGenerator):
         self.add_user_message(input_message)
         completion = self.__client.chat.completions.create(
             model=model,
-            messages=self.__messages,  # type: ignore
+            messages=messages_to_dicts(self.__messages),  # type: ignore
             max_tokens=1024,
             temperature=1,
             top_p=1,
@@ -53,7 +75,71 @@ class MessageGeneratorDeepSeek(ProtocolMessageGenerator):
 
         self.add_ai_message(output)
         return output
-    
+
+    def generate_stream(self, input_message: str, model: Optional[str] = None) -> Iterator[str]:
+        """!
+        @brief Потоковая генерация ответа с использованием DeepSeek API
+        
+        @param input_message Входное сообщение для обработки
+        @param model Название модели для генерации (опционально)
+        
+        @return Iterator[str] Фрагменты ответа по мере их получения
+        
+        @details
+        Полный ответ добавляется в историю после получения последнего фрагмента
+        """
+        if model is None or model == '':
+            model = self.__model
+        self.add_user_message(input_message)
+        stream = self.__client.chat.completions.create(
+            model=model,
+            messages=messages_to_dicts(self.__messages),  # type: ignore
+            max_tokens=1024,
+            temperature=1,
+            top_p=1,
+            stream=True,
+            stop=None,
+        )
+
+        parts: List[str] = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        self.add_ai_message("".join(parts))
+
+    def generate_structured(self, input_message: str, schema: Dict[str, Any], model: Optional[str] = None) -> str:
+        """!
+        @brief Генерация ответа в формате JSON с использованием DeepSeek API
+        
+        @param input_message Входное сообщение для обработки
+        @param schema JSON-схема ожидаемого ответа
+        @param model Название модели для генерации (опционально)
+        
+        @return str Сгенерированный ответ (JSON-строка)
+        """
+        if model is None or model == '':
+            model = self.__model
+        # JSON mode в DeepSeek не принимает схему, поэтому она передается системным сообщением,
+        # которое не сохраняется в истории
+        self.add_user_message(input_message)
+        completion = self.__client.chat.completions.create(
+            model=model,
+            messages=messages_to_dicts(self.__messages) + [schema_instruction_message(schema)],  # type: ignore
+            max_tokens=1024,
+            temperature=1,
+            top_p=1,
+            stream=False,
+            stop=None,
+            response_format={"type": "json_object"},
+        )
+        output: str = completion.choices[0].message.content  # type: ignore
+
+        self.add_ai_message(output)
+        return output
 
     def add_user_message(self, message_content: str) -> None:
         """!
@@ -61,11 +147,7 @@ class MessageGeneratorDeepSeek(ProtocolMessageGenerator):
         
         @param message_content Текст сообщения пользователя
         """
-        formatted_output: Dict[str, str] = {
-            "role": 'user',
-            "content": message_content
-        }
-        self.__messages.append(formatted_output)
+        self.__messages.append(Message('user', message_content))
 
     def add_ai_message(self, message_content: str) -> None:
         """!
@@ -73,11 +155,7 @@ class MessageGeneratorDeepSeek(ProtocolMessageGenerator):
         
         @param message_content Текст сообщения ИИ
         """
-        formatted_output: Dict[str, str] = {
-            "role": 'assistant',
-            "content": message_content
-        }
-        self.__messages.append(formatted_output)
+        self.__messages.append(Message('assistant', message_content))
 
     def add_system_message(self, message_content: str) -> None:
         """!
@@ -85,11 +163,15 @@ class MessageGeneratorDeepSeek(ProtocolMessageGenerator):
         
         @param message_content Текст системного сообщения
         """
-        formatted_output: Dict[str, str] = {
-            "role": 'system',
-            "content": message_content
-        }
-        self.__messages.append(formatted_output)
+        self.__messages.append(Message('system', message_content))
+
+    def extend_history(self, messages: List[Tuple[str, str]]) -> None:
+        """!
+        @brief Добавление нескольких сообщений в историю за один вызов
+        
+        @param messages Список пар (role, content), где role - 'user', 'assistant' или 'system'
+        """
+        self.__messages.extend(Message(role, content) for role, content in messages)
 
     def get_message_history(self) -> List[Dict[str, str]]:
         """!
@@ -97,4 +179,4 @@ class MessageGeneratorDeepSeek(ProtocolMessageGenerator):
         
         @return List[Dict[str, str]] Список сообщений в формате словарей
         """
-        return self.__messages
+        return messages_to_dicts(self.__messages)
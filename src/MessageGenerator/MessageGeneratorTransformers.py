@@ -1,7 +1,11 @@
 import os
-from typing import Optional, List, Dict
-from src.MessageGenerator.ProtocolMessageGenerator import ProtocolMessageGenerator
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import threading
+import itertools
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+from src.MessageGenerator.ProtocolMessageGenerator import ProtocolMessageGenerator, Message, messages_to_dicts, \
+    schema_instruction_message
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from transformers.utils.chat_template_utils import _compile_jinja_template
 import torch
 
 
@@ -13,25 +17,123 @@ class MessageGeneratorTransformers(ProtocolMessageGenerator):
     Реализует интерфейс ProtocolMessageGenerator для генерации сообщений
     через локальную модель Qwen, используя библиотеку transformers.
     """
-    __model: AutoModelForCausalLM
+    max_new_tokens = 2048  # Ограничение длины ответа (размышления модели отключены)
+    think_end_token_id = 151668  # ID токена </think> в словаре Qwen3
+    message_end_marker = "<|im_end|>"  # Специальный токен конца сообщения в шаблоне чата Qwen
+    # Загруженные модели общие для всех экземпляров:
+    # (model_name, quantize_4bit, replicate_per_gpu) -> (tokenizer, скомпилированный шаблон чата, [(model, lock)])
+    __shared_models: Dict[Tuple[str, bool, bool],
+                          Tuple[AutoTokenizer, Any, List[Tuple[AutoModelForCausalLM, threading.Lock]]]] = {}
+    __shared_models_lock = threading.Lock()
+    __replica_counter = itertools.count()  # Очередность выбора реплики, когда все заняты
+    __replicas: List[Tuple[AutoModelForCausalLM, threading.Lock]]
     __tokenizer: AutoTokenizer
-    __messages: List[Dict[str, str]]
+    __chat_template: Any  # jinja2.Template, скомпилированный из tokenizer.chat_template
+    __messages: List[Message]
+    __cached_prompt_text: str  # Часть промпта до конца последнего завершенного сообщения
+    __cached_prompt_ids: List[int]  # Токены этой части
     __model_name: str
 
-    def __init__(self, model_name: str = "Qwen/Qwen3-0.6B") -> None:
+    def __init__(self, model_name: str = "Qwen/Qwen3-0.6B", quantize_4bit: bool = False,
+                 replicate_per_gpu: bool = False) -> None:
         """!
         @brief Инициализация генератора сообщений
         
         @param model_name Название модели для генерации
+        @param quantize_4bit Загружать веса модели в 4-битной квантизации (требуется bitsandbytes и CUDA)
+        @param replicate_per_gpu Загрузить по копии модели на каждую видеокарту, чтобы сессии генерировали параллельно
         """
         self.__model_name = model_name
-        self.__tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.__model = AutoModelForCausalLM.from_pretrained(
-            model_name,
-            torch_dtype="auto",
-            device_map="auto"
-        )
+        self.__tokenizer, self.__chat_template, self.__replicas = \
+            self.__get_shared_model(model_name, quantize_4bit, replicate_per_gpu)
         self.__messages = []
+        self.__cached_prompt_text = ""
+        self.__cached_prompt_ids = []
+
+    @classmethod
+    def __get_shared_model(cls, model_name: str, quantize_4bit: bool, replicate_per_gpu: bool) \
+            -> Tuple[AutoTokenizer, Any, List[Tuple[AutoModelForCausalLM, threading.Lock]]]:
+        """!
+        @brief Получение общей модели и токенизатора
+        
+        @param model_name Название модели
+        @param quantize_4bit Загружать веса в 4-битной квантизации NF4 с вычислениями в bfloat16
+        @param replicate_per_gpu Загрузить отдельную копию модели на каждую доступную видеокарту
+        
+        @return Tuple[AutoTokenizer, Any, List[Tuple[AutoModelForCausalLM, threading.Lock]]] Токенизатор,
+            скомпилированный шаблон чата и список реплик модели с блокировками генерации
+        
+        @details
+        Веса модели загружаются один раз на процесс, история сообщений хранится в каждом экземпляре.
+        Jinja-шаблон чата компилируется вместе с загрузкой модели, а не при каждом запросе.
+        Генерация на одной реплике выполняется последовательно под ее блокировкой.
+        """
+        key = (model_name, quantize_4bit, replicate_per_gpu)
+        with cls.__shared_models_lock:
+            if key not in cls.__shared_models:
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                quantization_config = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=torch.bfloat16
+                ) if quantize_4bit else None
+                # Одна реплика распределяется по всем устройствам, при репликации каждая занимает свою видеокарту
+                device_maps: List[Any] = [{"": device} for device in range(torch.cuda.device_count())] \
+                    if replicate_per_gpu and torch.cuda.device_count() > 1 else ["auto"]
+                replicas = [(AutoModelForCausalLM.from_pretrained(
+                    model_name,
+                    torch_dtype="auto",
+                    device_map=device_map,
+                    quantization_config=quantization_config
+                ), threading.Lock()) for device_map in device_maps]
+                chat_template = _compile_jinja_template(tokenizer.chat_template)
+                cls.__shared_models[key] = (tokenizer, chat_template, replicas)
+            return cls.__shared_models[key]
+
+    def __acquire_replica(self) -> Tuple[AutoModelForCausalLM, threading.Lock]:
+        """!
+        @brief Захват свободной реплики модели
+        
+        @return Tuple[AutoModelForCausalLM, threading.Lock] Реплика и ее захваченная блокировка
+        
+        @details
+        Выбирается первая незанятая реплика. Если заняты все, запрос ожидает
+        реплику, выбранную по очереди, чтобы нагрузка распределялась равномерно.
+        Блокировку должен освободить вызывающий код.
+        """
+        for model, lock in self.__replicas:
+            if lock.acquire(blocking=False):
+                return model, lock
+        model, lock = self.__replicas[next(self.__replica_counter) % len(self.__replicas)]
+        lock.acquire()
+        return model, lock
+
+    def __tokenize_prompt(self, text: str) -> List[int]:
+        """!
+        @brief Токенизация промпта с переиспользованием токенов предыдущих сообщений
+        
+        @param text Полный промпт, построенный по шаблону чата
+        
+        @return List[int] Токены промпта
+        
+        @details
+        Токены сохраняются для части промпта до конца последнего завершенного сообщения.
+        Если новый промпт начинается с этой части, токенизируется только добавленный текст.
+        Разрез проходит сразу после специального токена конца сообщения,
+        поэтому результат совпадает с токенизацией всего текста.
+        """
+        if self.__cached_prompt_text and text.startswith(self.__cached_prompt_text):
+            base_text, base_ids = self.__cached_prompt_text, self.__cached_prompt_ids
+        else:
+            base_text, base_ids = "", []
+
+        boundary = text.rfind(self.message_end_marker)
+        boundary = boundary + len(self.message_end_marker) if boundary >= len(base_text) else len(base_text)
+        stable_ids = base_ids + self.__tokenizer(text[len(base_text):boundary], add_special_tokens=False).input_ids
+        tail_ids = self.__tokenizer(text[boundary:], add_special_tokens=False).input_ids
+
+        self.__cached_prompt_text, self.__cached_prompt_ids = text[:boundary], stable_ids
+        return stable_ids + tail_ids
 
     def generate(self, input_message: str, model: Optional[str] = None) -> str:
         """!
@@ -43,34 +145,77 @@ class MessageGeneratorTransformers(ProtocolMessageGenerator):
         @return str Сгенерированный ответ
         """
         self.add_user_message(input_message)
+        content = self.__generate_reply(messages_to_dicts(self.__messages))
+        
+        # Сохраняем ответ в историю
+        self.add_ai_message(content)
+        return content
+
+    def __generate_reply(self, messages: List[Dict[str, str]]) -> str:
+        """!
+        @brief Генерация ответа модели на подготовленный список сообщений
+        
+        @param messages Сообщения запроса в формате {"role": ..., "content": ...}
         
+        @return str Финальный ответ модели без размышлений
+        """
         # Подготовка входных данных
-        text = self.__tokenizer.apply_chat_template(
-            self.__messages,
-            tokenize=False,
+        text = self.__chat_template.render(
+            messages=messages,
             add_generation_prompt=True,
-            enable_thinking=False
+            enable_thinking=False,
+            **self.__tokenizer.special_tokens_map
         )
-        model_inputs = self.__tokenizer(text, return_tensors="pt").to(self.__model.device)
+        prompt_ids = self.__tokenize_prompt(text)
         
-        # Генерация ответа
-        generated_ids = self.__model.generate(
-            **model_inputs,
-            max_new_tokens=32768
-        )
-        output_ids = generated_ids[0][len(model_inputs.input_ids[0]):].tolist()
-        
-        # Парсинг ответа
+        # Генерация ответа на свободной реплике
+        model, lock = self.__acquire_replica()
         try:
-            # Поиск маркера конца размышлений
-            index = len(output_ids) - output_ids[::-1].index(151668)
-        except ValueError:
-            index = 0
+            input_ids = torch.tensor([prompt_ids], device=model.device)
+            with torch.inference_mode():
+                generated_ids = model.generate(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    max_new_tokens=self.max_new_tokens
+                )
+        finally:
+            lock.release()
+        output_ids = generated_ids[0, input_ids.shape[1]:]
+        
+        # Парсинг ответа: ответ начинается после последнего маркера конца размышлений
+        think_end_positions = (output_ids == self.think_end_token_id).nonzero()
+        index = think_end_positions[-1].item() + 1 if think_end_positions.numel() > 0 else 0
         
         # Извлекаем только финальный ответ
-        content = self.__tokenizer.decode(output_ids[index:], skip_special_tokens=True).strip("\n")
+        return self.__tokenizer.decode(output_ids[index:], skip_special_tokens=True).strip("\n")
+
+    def generate_stream(self, input_message: str, model: Optional[str] = None) -> Iterator[str]:
+        """!
+        @brief Потоковая генерация ответа с использованием модели Qwen
         
-        # Сохраняем ответ в историю
+        @param input_message Входное сообщение для обработки
+        @param model Название модели для генерации (игнорируется, используется модель из конструктора)
+        
+        @return Iterator[str] Фрагменты ответа
+        
+        @note Локальная модель отдает ответ целиком одним фрагментом
+        """
+        yield self.generate(input_message, model)
+
+    def generate_structured(self, input_message: str, schema: Dict[str, Any], model: Optional[str] = None) -> str:
+        """!
+        @brief Генерация ответа в формате JSON с использованием модели Qwen
+        
+        @param input_message Входное сообщение для обработки
+        @param schema JSON-схема ожидаемого ответа
+        @param model Название модели для генерации (опционально)
+        
+        @return str Сгенерированный ответ (JSON-строка)
+        """
+        # Локальная модель не поддерживает ограниченное декодирование, поэтому схема передается
+        # системным сообщением, которое не сохраняется в истории
+        self.add_user_message(input_message)
+        content = self.__generate_reply(messages_to_dicts(self.__messages) + [schema_instruction_message(schema)])
         self.add_ai_message(content)
         return content
 
@@ -80,11 +225,7 @@ class MessageGeneratorTransformers(ProtocolMessageGenerator):
         
         @param message_content Текст сообщения пользователя
         """
-        formatted_output: Dict[str, str] = {
-            "role": 'user',
-            "content": message_content
-        }
-        self.__messages.append(formatted_output)
+        self.__messages.append(Message('user', message_content))
 
     def add_ai_message(self, message_content: str) -> None:
         """!
@@ -92,11 +233,7 @@ class MessageGeneratorTransformers(ProtocolMessageGenerator):
         
         @param message_content Текст сообщения ИИ
         """
-        formatted_output: Dict[str, str] = {
-            "role": 'assistant',
-            "content": message_content
-        }
-        self.__messages.append(formatted_output)
+        self.__messages.append(Message('assistant', message_content))
 
     def add_system_message(self, message_content: str) -> None:
         """!
@@ -104,11 +241,15 @@ class MessageGeneratorTransformers(ProtocolMessageGenerator):
         
         @param message_content Текст системного сообщения
         """
-        formatted_output: Dict[str, str] = {
-            "role": 'system',
-            "content": message_content
-        }
-        self.__messages.append(formatted_output)
+        self.__messages.append(Message('system', message_content))
+
+    def extend_history(self, messages: List[Tuple[str, str]]) -> None:
+        """!
+        @brief Добавление нескольких сообщений в историю за один вызов
+        
+        @param messages Список пар (role, content), где role - 'user', 'assistant' или 'system'
+        """
+        self.__messages.extend(Message(role, content) for role, content in messages)
 
     def get_message_history(self) -> List[Dict[str, str]]:
         """!
@@ -116,4 +257,4 @@ class MessageGeneratorTransformers(ProtocolMessageGenerator):
         
         @return List[Dict[str, str]] Список сообщений в формате словарей
         """
-        return self.__messages 
\ No newline at end of file
+        return messages_to_dicts(self.__messages) 
\ No newline at end of file
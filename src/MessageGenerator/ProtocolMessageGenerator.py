@@ -1,4 +1,43 @@
-from typing import Protocol, Optional, List, Dict
+import json
+from typing import Protocol, Optional, List, Dict, Any, Tuple, NamedTuple, Iterator
+
+
+class Message(NamedTuple):
+    """!
+    @brief Сообщение истории диалога
+    
+    @details
+    Компактное неизменяемое представление сообщения. В словари формата
+    chat completions сообщения преобразуются только при отправке запроса.
+    """
+    role: str
+    content: str
+
+
+def messages_to_dicts(messages: List[Message]) -> List[Dict[str, str]]:
+    """!
+    @brief Преобразование истории в список словарей для API
+    
+    @param messages История сообщений
+    
+    @return List[Dict[str, str]] Сообщения в формате {"role": ..., "content": ...}
+    """
+    return [{"role": message.role, "content": message.content} for message in messages]
+
+
+def schema_instruction_message(schema: Dict[str, Any]) -> Dict[str, str]:
+    """!
+    @brief Системное сообщение с JSON-схемой ответа для одного запроса
+    
+    @param schema JSON-схема ожидаемого ответа
+    
+    @return Dict[str, str] Сообщение в формате {"role": "system", "content": ...}
+    
+    @details
+    Для провайдеров, не принимающих схему в параметрах запроса. Сообщение добавляется
+    только к отправляемому запросу и не сохраняется в истории диалога.
+    """
+    return {"role": "system", "content": f"Respond only with JSON matching this schema:\n{json.dumps(schema)}"}
 
 
 class ProtocolMessageGenerator(Protocol):
@@ -21,6 +60,29 @@ class ProtocolMessageGenerator(Protocol):
         """
         ...
 
+    def generate_stream(self, messages: str, model: str = '') -> Iterator[str]:
+        """!
+        @brief Потоковая генерация ответа на основе входного сообщения
+        
+        @param messages Входное сообщение для обработки
+        @param model Название модели для генерации (опционально)
+        
+        @return Iterator[str] Фрагменты ответа по мере их получения
+        """
+        ...
+
+    def generate_structured(self, messages: str, schema: Dict[str, Any], model: str = '') -> str:
+        """!
+        @brief Генерация ответа в формате JSON, соответствующего схеме
+        
+        @param messages Входное сообщение для обработки
+        @param schema JSON-схема ожидаемого ответа
+        @param model Название модели для генерации (опционально)
+        
+        @return str Сгенерированный ответ (JSON-строка)
+        """
+        ...
+
     def add_user_message(self, message: str) -> None:
         """!
         @brief Добавление сообщения пользователя в историю
@@ -45,6 +107,14 @@ class ProtocolMessageGenerator(Protocol):
         """
         ...
 
+    def extend_history(self, messages: List[Tuple[str, str]]) -> None:
+        """!
+        @brief Добавление нескольких сообщений в историю за один вызов
+        
+        @param messages Список пар (role, content), где role - 'user', 'assistant' или 'system'
+        """
+        ...
+
     def get_message_history(self) -> List[Dict[str, str]]:
         """!
         @brief Получение истории сообщений
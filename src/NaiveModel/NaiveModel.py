@@ -1,9 +1,62 @@
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List
+from concurrent.futures import ThreadPoolExecutor, Future, wait
 from src.MessageGenerator.BaseMessageGenerator import get_base_message_generator, RequesterClass
 from src.DatabaseManager.DatabaseManager import DatabaseManager
 from src.ImageGenerator.ImageGeneratorGoogle import ImageGeneratorGoogle
 import os
+import logging
 from src.config import IMAGE_OUTPUT_DIR
+from src.NaiveModel.QuoteExtractorBatcher import QuoteExtractorBatcher
+
+# Шаблон начального промпта мастера игры, заполняется данными сессии
+world_prompt_template = """
+        You are a game master in a role-playing game. Your task is to respond to the player's actions and questions.
+        
+        World description:
+        {world}
+        
+        Player character description:
+        {player}
+        
+        Important:
+        - All your responses must be in {language} language
+        - Be creative and engaging
+        - Be brief, the usual answer is 1-2 sentences
+        - Maintain consistency with the world description
+        - Respond to player actions and questions directly
+        - Never describe what the player is doing, respond to his actions
+        
+        If you understand these guidelines, write "Ready to narrate".
+        """
+ready_response = "Ready to narrate"
+
+# Начало запроса изображения сцены, перед ответом модели
+image_prompt_header = """
+        Based on this game master's response, create a detailed visual description of the scene:
+        """
+# Неизменяемая часть запроса изображения сцены
+image_instructions = """
+        Important:
+        - Focus on the visual elements and atmosphere
+        - Do not include any text or words in the image
+        - Make it cinematic and dramatic
+        - Include environmental details
+        - Show the scene from a third-person perspective
+        3. Visual Style:
+           - Use a consistent gloomy classical painting style
+           - Emphasize dramatic chiaroscuro lighting
+           - Use muted dark tones (charcoal black, deep navy, antique gold)
+           - Include Baroque/Romantic-era aesthetics
+           - Show weathered oil texture and cracked varnish aging
+           - Use somber atmospheric lighting
+           - Include Goya-esque melancholy and Caravaggio-inspired contrasts
+           - Add Turner-like stormy ambiance
+           - Include haunting ethereal undertones
+           - Show detailed brushwork on textures (stone, fabric)
+           - Use cold palette with crimson accents
+           - Include gothic decay motifs and misty spectral ambiance
+
+        """
 
 class NaiveModel:
     """!
@@ -17,6 +70,13 @@ class NaiveModel:
     4. Сохраняет промпты для диалогов
     5. Не использует сложную архитектуру с GameMaster и Actor
     """
+    # Общий пул потоков для параллельных запросов к моделям
+    __executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="NaiveModel")
+    # Отдельный поток записи в базу, чтобы записи шли по порядку и не ждали генерацию изображений
+    __db_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="NaiveModelDB")
+    # Минимальная длина начала ответа, по которому можно запускать генерацию изображения
+    __early_image_min_chars: int = 120
+    __sentence_end_marks: Tuple[str, ...] = ('.', '!', '?', '…')
     
     def __init__(self, session_id: int) -> None:
         """!
@@ -27,7 +87,6 @@ class NaiveModel:
         self.__session_id = session_id
         self.__db = DatabaseManager()
         self.__messageGenerator = get_base_message_generator(RequesterClass.GameMaster)
-        self.__messageGeneratorDialog = get_base_message_generator(RequesterClass.DialogProcessor)
 
         self.__imageGenerator = ImageGeneratorGoogle(session_id)
         
@@ -37,6 +96,7 @@ class NaiveModel:
             raise ValueError(f"Session {session_id} not found")
             
         self.__world_description, self.__player_description, self.__language, self.__initial_message, self.__initial_message_eng = session_info
+        self.__pending_save: Optional[Future[None]] = None  # Незавершенная запись предыдущего хода
         
         # Initialize with world description
         self._initialize_world()
@@ -48,39 +108,37 @@ class NaiveModel:
         @details
         Добавляет описание мира в историю сообщений
         """
-        world_prompt = f"""
-        You are a game master in a role-playing game. Your task is to respond to the player's actions and questions.
-        
-        World description:
-        {self.__world_description}
-        
-        Player character description:
-        {self.__player_description}
-        
-        Important:
-        - All your responses must be in {self.__language} language
-        - Be creative and engaging
-        - Be brief, the usual answer is 1-2 sentences
-        - Maintain consistency with the world description
-        - Respond to player actions and questions directly
-        - Never describe what the player is doing, respond to his actions
-        
-        If you understand these guidelines, write "Ready to narrate".
-        """
+        world_prompt = world_prompt_template.format_map({
+            'world': self.__world_description,
+            'player': self.__player_description,
+            'language': self.__language,
+        })
         
         is_new_session = self.__db.is_new_session_gm_prompt(self.__session_id)
         
         self.__messageGenerator.add_system_message(world_prompt)
-        response = "Ready to narrate"
+        response = ready_response
         self.__messageGenerator.add_ai_message(response)
         self.__db.save_game_master_prompt(self.__session_id, "start", world_prompt, response)
         
         # Load message history
         master_history = self.__db.get_master_messages(self.__session_id)
+        self.__master_count = len(master_history)
         for _, user_input, master_output, _ in master_history:
             self.__messageGenerator.add_user_message(user_input)
             self.__messageGenerator.add_ai_message(master_output)
 
+    @staticmethod
+    def __log_save_error(future: Future[None]) -> None:
+        """!
+        @brief Логирование ошибки фоновой записи хода в базу данных
+        
+        @param future Завершенная задача записи
+        """
+        error = future.exception()
+        if error is not None:
+            logging.error(f"Error saving turn: {str(error)}")
+
     def _extract_quotes(self, text: str, sequence_number: int) -> None:
         """!
         @brief Извлечение цитат из текста и сохранение промпта
@@ -88,94 +146,70 @@ class NaiveModel:
         @param text Текст для обработки
         @param sequence_number Порядковый номер сообщения
         """
-        quote_prompt = f"""
-        You are a dialogue processor. Your task is to identify direct speech in the text and mark who is speaking.
-        
-        Rules:
-        1. Format each direct speech segment as:
-           Speaker=={{speaker_name}}
-           Text=={{exact_quote}}
-        
-        2. Format requirements:
-           - Each segment must start with "Speaker==" followed by the speaker's name
-           - The next line must start with "Text==" followed by the EXACT quote
-           - There must be no empty lines between Speaker== and Text==
-           - Each new dialogue segment should be separated by a blank line
-        
-        3. Text processing rules:
-           - ONLY mark direct speech (text in quotes)
-           - Keep the exact quote as it appears in the text
-           - Do not add any additional text or explanations
-           - Do not modify the text content
-           - Preserve all punctuation and formatting
-        
-        Text to process:
-        {text}
-        
-        Return only the direct speech segments in the specified format, nothing else.
-        """
-        
-        dialog_response = self.__messageGeneratorDialog.generate(quote_prompt)
+        # Requests from all sessions are grouped into shared model calls,
+        # so the saved prompt is the one the batcher actually sent
+        quote_prompt, dialog_response = QuoteExtractorBatcher().submit(text).result()
         self.__db.save_dialogue_prompt(self.__session_id, sequence_number, quote_prompt, dialog_response)
     
-    def generate_response(self, message: str) -> Tuple[str, Optional[str]]:
+    def _generate_image(self, response: str, image_number: int) -> Optional[str]:
         """!
-        @brief Генерация ответа на сообщение пользователя
+        @brief Генерация изображения сцены по ответу модели
         
-        @param message Сообщение пользователя
+        @param response Ответ модели
+        @param image_number Номер изображения в сессии
         
-        @return Tuple[str, Optional[str]] Кортеж (ответ модели, путь к изображению)
+        @return Optional[str] Путь к изображению или None в случае ошибки
         """
-        # Generate response
-        response = self.__messageGenerator.generate(message)
-        
-        # Get sequence number for dialogue prompt
-        sequence_number = len(self.__db.get_master_messages(self.__session_id)) + 1
-        
-        # Extract and save quotes
-        self._extract_quotes(response, sequence_number)
+        image_prompt = "".join((image_prompt_header, response, "\n        ", image_instructions))
         
-        # Generate image prompt
-        image_prompt = f"""
-        Based on this game master's response, create a detailed visual description of the scene:
-        {response}
-        
-        Important:
-        - Focus on the visual elements and atmosphere
-        - Do not include any text or words in the image
-        - Make it cinematic and dramatic
-        - Include environmental details
-        - Show the scene from a third-person perspective
-        3. Visual Style:
-           - Use a consistent gloomy classical painting style
-           - Emphasize dramatic chiaroscuro lighting
-           - Use muted dark tones (charcoal black, deep navy, antique gold)
-           - Include Baroque/Romantic-era aesthetics
-           - Show weathered oil texture and cracked varnish aging
-           - Use somber atmospheric lighting
-           - Include Goya-esque melancholy and Caravaggio-inspired contrasts
-           - Add Turner-like stormy ambiance
-           - Include haunting ethereal undertones
-           - Show detailed brushwork on textures (stone, fabric)
-           - Use cold palette with crimson accents
-           - Include gothic decay motifs and misty spectral ambiance
-
-        """
-        
-        # Generate image
-        image_path = None
         try:
             # Create image path
-            image_number = len(self.__db.get_master_messages(self.__session_id)) + 1
             image_path = os.path.join(IMAGE_OUTPUT_DIR, str(self.__session_id), f"{image_number}.png")
             
             # Generate and save image
-            image_path = self.__imageGenerator.generate_image_response(image_prompt, image_path)
+            return self.__imageGenerator.generate_image_response(image_prompt, image_path)
         except Exception as e:
             print(f"Error generating image: {str(e)}")
+            return None
+
+    def generate_response(self, message: str) -> Tuple[str, Optional[str]]:
+        """!
+        @brief Генерация ответа на сообщение пользователя
+        
+        @param message Сообщение пользователя
+        
+        @return Tuple[str, Optional[str]] Кортеж (ответ модели, путь к изображению)
+        """
+        # The previous turn must be in the database before the next one is numbered;
+        # its errors are already logged by the done-callback
+        if self.__pending_save is not None:
+            wait((self.__pending_save,))
+        
+        # Get sequence number for dialogue prompt and image
+        sequence_number = self.__master_count + 1
+        
+        # Stream the response and start the image as soon as the first complete sentences arrive
+        image_future = None
+        parts: List[str] = []
+        length = 0
+        for chunk in self.__messageGenerator.generate_stream(message):
+            parts.append(chunk)
+            length += len(chunk)
+            if image_future is None and length >= self.__early_image_min_chars \
+                    and any(mark in chunk for mark in self.__sentence_end_marks):
+                image_future = self.__executor.submit(self._generate_image, "".join(parts), sequence_number)
+        response = "".join(parts)
+        if image_future is None:
+            image_future = self.__executor.submit(self._generate_image, response, sequence_number)
+        
+        # Quote extraction needs the full response and runs while the image is being generated
+        self._extract_quotes(response, sequence_number)
+        image_path = image_future.result()
         
-        # Save to database
-        self.__db.save_user_message(self.__session_id, message, response)
-        self.__db.save_master_message(self.__session_id, message, response, response)
+        # Save to database in one transaction, off the response path
+        self.__pending_save = self.__db_executor.submit(
+            self.__db.save_turn, self.__session_id, message, response, response, response)
+        self.__pending_save.add_done_callback(self.__log_save_error)
+        self.__master_count += 1
         
         return response, image_path 
\ No newline at end of file
@@ -0,0 +1,132 @@
+import re
+import threading
+import queue
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+from src.MessageGenerator.BaseMessageGenerator import get_base_message_generator, RequesterClass
+
+# Неизменяемые инструкции стоят в начале промпта, чтобы провайдер мог
+# переиспользовать кэш общего префикса между запросами
+quote_instructions = """
+        You are a dialogue processor. Your task is to identify direct speech in the text and mark who is speaking.
+        
+        Rules:
+        1. Format each direct speech segment as:
+           Speaker=={speaker_name}
+           Text=={exact_quote}
+        
+        2. Format requirements:
+           - Each segment must start with "Speaker==" followed by the speaker's name
+           - The next line must start with "Text==" followed by the EXACT quote
+           - There must be no empty lines between Speaker== and Text==
+           - Each new dialogue segment should be separated by a blank line
+        
+        3. Text processing rules:
+           - ONLY mark direct speech (text in quotes)
+           - Keep the exact quote as it appears in the text
+           - Do not add any additional text or explanations
+           - Do not modify the text content
+           - Preserve all punctuation and formatting
+        
+        Return only the direct speech segments in the specified format, nothing else.
+        """
+
+batch_instructions = """
+        Process each numbered text below independently. For every text write a line "Result [n]:"
+        with its number, followed by the direct speech segments of that text in the format above.
+        If a text has no direct speech, leave its result empty.
+        """
+
+
+class QuoteExtractorBatcher:
+    """!
+    @brief Группировка запросов на извлечение прямой речи
+    
+    @details
+    Собирает тексты, поступающие из разных сессий, и отправляет их модели
+    одним пронумерованным запросом. Пока модель обрабатывает предыдущий пакет,
+    новые тексты накапливаются в очереди; затем в пакет забирается все, что
+    успело поступить, но не более max_batch_size текстов. Одиночный запрос
+    отправляется сразу, без ожидания.
+    Результаты разбираются по маркерам "Result [n]:" и возвращаются через Future
+    вместе с промптом, который был фактически отправлен модели.
+    
+    @note Класс реализован как Singleton
+    """
+    _instance = None
+    __instance_lock = threading.Lock()
+    max_batch_size = 8
+    __queue: "queue.Queue[Tuple[str, Future[Tuple[str, str]]]]"
+
+    def __new__(cls) -> 'QuoteExtractorBatcher':
+        """!
+        @brief Реализация паттерна Singleton
+        
+        @return QuoteExtractorBatcher Единственный экземпляр класса
+        """
+        if cls._instance is None:
+            with cls.__instance_lock:
+                if cls._instance is None:
+                    instance = super(QuoteExtractorBatcher, cls).__new__(cls)
+                    instance.__queue = queue.Queue()
+                    threading.Thread(target=instance.__run, name="QuoteExtractorBatcher", daemon=True).start()
+                    cls._instance = instance
+        return cls._instance
+
+    def submit(self, text: str) -> "Future[Tuple[str, str]]":
+        """!
+        @brief Постановка текста в очередь на обработку
+        
+        @param text Текст для извлечения прямой речи
+        
+        @return Future[Tuple[str, str]] Кортеж (отправленный промпт, ответ модели для этого текста в формате Speaker==/Text==)
+        """
+        future: Future[Tuple[str, str]] = Future()
+        self.__queue.put((text, future))
+        return future
+
+    def __run(self) -> None:
+        """!
+        @brief Цикл фонового потока, собирающего и отправляющего пакеты
+        """
+        while True:
+            batch = [self.__queue.get()]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                results = self.__process_batch([text for text, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+    @staticmethod
+    def __process_batch(texts: List[str]) -> List[Tuple[str, str]]:
+        """!
+        @brief Обработка пакета текстов одним запросом к модели
+        
+        @param texts Список текстов
+        
+        @return List[Tuple[str, str]] Пары (отправленный промпт, ответ) для каждого текста в исходном порядке;
+                промпт общий для всего пакета и состоит из системного и пользовательского сообщений
+        """
+        # The generator keeps history, so every batch gets a fresh one: each request
+        # carries only the rules as a system message and the texts as the user message
+        generator = get_base_message_generator(RequesterClass.DialogProcessor)
+        if len(texts) == 1:
+            generator.add_system_message(quote_instructions)
+            return [(f"{quote_instructions}\n{texts[0]}", generator.generate(texts[0]))]
+
+        system_message = quote_instructions + batch_instructions
+        generator.add_system_message(system_message)
+        numbered_texts = "\n\n".join(f"Text [{i}]:\n{text}" for i, text in enumerate(texts, 1))
+        prompt = f"{system_message}\n{numbered_texts}"
+        response = generator.generate(numbered_texts)
+
+        parts = re.split(r'^\s*Result \[(\d+)\]:', response, flags=re.MULTILINE)
+        results: Dict[int, str] = {int(number): body.strip() for number, body in zip(parts[1::2], parts[2::2])}
+        return [(prompt, results.get(i, "")) for i in range(1, len(texts) + 1)]
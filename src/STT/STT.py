@@ -2,7 +2,8 @@ import speech_recognition as sr  # type: ignore
 from typing import Optional, Dict
 import numpy as np
 from pydub import AudioSegment  # type: ignore
-import os
+import io
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
 
 class STT:
@@ -18,10 +19,11 @@ class STT:
     """
     __instance: Optional['STT'] = None
     __recognizer: Optional[sr.Recognizer] = None
-    __silence_duration_ms: int = 2000  # 2 секунды тишины в начале
     __energy_threshold: float = 300  # Порог энергии для определения речи
     __pause_threshold: float = 0.8  # Порог паузы между словами
     __dynamic_energy_threshold: bool = True  # Динамическая настройка порога энергии
+    __hedge_delay_seconds: float = 2.0  # Время ожидания Google до запуска резервного Sphinx
+    __executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="STT")
     
     # Словарь соответствия языков и их кодов
     __language_codes: Dict[str, str] = {
@@ -42,22 +44,14 @@ class STT:
         """
         if cls.__instance is None:
             cls.__instance = super(STT, cls).__new__(cls)
-            cls.__recognizer = sr.Recognizer()
+            recognizer = sr.Recognizer()
+            # Настройка параметров распознавателя выполняется один раз при создании экземпляра
+            recognizer.energy_threshold = cls.__energy_threshold
+            recognizer.pause_threshold = cls.__pause_threshold
+            recognizer.dynamic_energy_threshold = cls.__dynamic_energy_threshold
+            cls.__recognizer = recognizer
         return cls.__instance
 
-    def __init__(self) -> None:
-        """!
-        @brief Инициализация распознавателя речи
-        
-        @note Метод выполняется только при первом создании экземпляра
-        """
-        if self.__recognizer is None:
-            self.__recognizer = sr.Recognizer()
-            # Настройка параметров распознавателя
-            self.__recognizer.energy_threshold = self.__energy_threshold
-            self.__recognizer.pause_threshold = self.__pause_threshold
-            self.__recognizer.dynamic_energy_threshold = self.__dynamic_energy_threshold
-
     def set_language(self, language: str) -> None:
         """!
         @brief Установка языка распознавания
@@ -78,44 +72,58 @@ class STT:
         """
         return self.__current_language
 
-    def __add_silence_padding(self, audio_path: str) -> str:
+    @staticmethod
+    def __record(recognizer: sr.Recognizer, audio_path: str) -> sr.AudioData:
         """!
-        @brief Добавление тишины в начало аудиофайла
+        @brief Чтение аудиофайла в аудиоданные распознавателя
+        
+        @param recognizer Распознаватель речи
+        @param audio_path Путь к аудиофайлу
         
-        @param audio_path Путь к исходному аудиофайлу
+        @return sr.AudioData Записанные аудиоданные
         
-        @return str Путь к новому аудиофайлу с добавленной тишиной
+        @details
+        WAV, AIFF и FLAC читаются напрямую. Остальные форматы конвертируются
+        в WAV через pydub в памяти, без записи на диск.
         """
         try:
-            # Загрузка аудиофайла
-            audio = AudioSegment.from_file(audio_path)
-            
-            # Создание тишины
-            silence = AudioSegment.silent(duration=self.__silence_duration_ms)
-            
-            # Добавление тишины в начало
-            audio_with_silence = silence + audio
-            
-            # Создание временного файла
-            temp_path = audio_path.replace('.wav', '_with_silence.wav')
-            audio_with_silence.export(temp_path, format="wav")
-            
-            return temp_path
-        except Exception as e:
-            print(f"Ошибка при добавлении тишины: {str(e)}")
-            return audio_path
+            with sr.AudioFile(audio_path) as source:
+                return recognizer.record(source)
+        except ValueError:
+            buffer = io.BytesIO()
+            AudioSegment.from_file(audio_path).export(buffer, format="wav")
+            buffer.seek(0)
+            with sr.AudioFile(buffer) as source:
+                return recognizer.record(source)
 
-    def __cleanup_temp_file(self, temp_path: str) -> None:
+    def __recognize(self, recognizer: sr.Recognizer, audio_data: sr.AudioData, language_code: str) -> Optional[str]:
         """!
-        @brief Удаление временного файла
+        @brief Распознавание речи с отложенным резервным запросом
+        
+        @param recognizer Распознаватель речи
+        @param audio_data Записанные аудиоданные
+        @param language_code Код языка распознавания
+        
+        @return Optional[str] Распознанный текст или None, если речь не распознана
         
-        @param temp_path Путь к временному файлу
+        @details
+        Основной распознаватель - Google Speech Recognition. Если он не ответил
+        за __hedge_delay_seconds или завершился ошибкой, параллельно запускается Sphinx,
+        и возвращается первый успешный результат.
         """
-        try:
-            if os.path.exists(temp_path) and '_with_silence.wav' in temp_path:
-                os.remove(temp_path)
-        except Exception as e:
-            print(f"Ошибка при удалении временного файла: {str(e)}")
+        google_future = self.__executor.submit(recognizer.recognize_google, audio_data, language=language_code)
+        wait([google_future], timeout=self.__hedge_delay_seconds)
+        if google_future.done() and google_future.exception() is None:
+            return str(google_future.result())
+
+        sphinx_future = self.__executor.submit(recognizer.recognize_sphinx, audio_data, language=language_code)
+        for future in as_completed([google_future, sphinx_future]):
+            error = future.exception()
+            if error is None:
+                return str(future.result())
+            if not isinstance(error, (sr.UnknownValueError, sr.RequestError)):
+                raise error
+        return None
 
     def audio_to_text(self, audio_path: str) -> str:
         """!
@@ -128,39 +136,19 @@ class STT:
         @throws sr.UnknownValueError если речь не может быть распознана
         @throws sr.RequestError если возникла ошибка при подключении к API
         """
-        temp_path = None
         try:
-            # Добавляем тишину в начало файла
-            temp_path = self.__add_silence_padding(audio_path)
-            
             if self.__recognizer is None:
                 return "Ошибка: распознаватель речи не инициализирован"
                 
-            with sr.AudioFile(temp_path) as source:
-                # Настройка распознавателя для уменьшения шума
-                self.__recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio_data = self.__recognizer.record(source)
+            audio_data = self.__record(self.__recognizer, audio_path)
                 
-                # Получаем код языка для Google Speech Recognition
-                language_code = self.__language_codes[self.__current_language]
-                
-                # Сначала пробуем использовать Google Speech Recognition
-                try:
-                    text = self.__recognizer.recognize_google(audio_data, language=language_code)
-                    return str(text)
-                except (sr.UnknownValueError, sr.RequestError):
-                    # Если Google не сработал, пробуем Sphinx
-                    try:
-                        text = self.__recognizer.recognize_sphinx(audio_data, language=language_code)
-                        return str(text)
-                    except (sr.UnknownValueError, sr.RequestError):
-                        return "Речь не распознана"
+            # Получаем код языка для Google Speech Recognition
+            language_code = self.__language_codes[self.__current_language]
+            
+            text = self.__recognize(self.__recognizer, audio_data, language_code)
+            return text if text is not None else "Речь не распознана"
         except Exception as e:
             return f"Ошибка при обработке аудио: {str(e)}"
-        finally:
-            # Удаляем временный файл
-            if temp_path:
-                self.__cleanup_temp_file(temp_path)
 
 
 # Пример использования
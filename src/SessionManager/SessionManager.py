@@ -40,7 +40,13 @@ class SessionManager:
         @return GameMaster Объект мастера игры для управления сессией
         
         @throws ValueError если сессия не найдена
+        
+        @details
+        Уже запущенная сессия возвращается из active_sessions без повторной загрузки истории
         """
+        game_master = self.active_sessions.get(session_id)
+        if game_master is not None:
+            return game_master
         
         # Get session info
         session_info = self.db.get_session_info(session_id)
@@ -49,7 +55,9 @@ class SessionManager:
             
         
         # Create game master
-        return GameMaster(session_id=session_id)
+        game_master = GameMaster(session_id=session_id)
+        self.active_sessions[session_id] = game_master
+        return game_master
 
     def get_session(self, session_id: int) -> Optional[GameMaster]:
         """!
@@ -61,12 +69,25 @@ class SessionManager:
         """
         return self.active_sessions.get(session_id)
 
+    def close_session(self, session_id: int) -> None:
+        """!
+        @brief Завершение активной игровой сессии
+        
+        @param session_id ID сессии
+        
+        @details
+        Удаляет мастера игры сессии из active_sessions, данные сессии в базе данных сохраняются
+        """
+        self.active_sessions.pop(session_id, None)
+
     def delete_user(self, user_id: int) -> None:
         """!
         @brief Удаление всех данных пользователя
         
         @param user_id ID пользователя
         """
+        for session_id, _, _, _ in self.db.get_user_sessions(user_id):
+            self.close_session(session_id)
         self.db.delete_user_data(user_id) 
     
     def create_session(self, user_id: int, world_description: str, player_description: str, language: str, initial_message: str, initial_message_eng: str) -> int:
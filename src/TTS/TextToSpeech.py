@@ -1,13 +1,24 @@
 import os
+import re
 from google.cloud import texttospeech
-from dotenv import load_dotenv
 import logging
+import threading
+from io import BytesIO
 from typing import Optional, Dict, Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from pedalboard import Pedalboard, PitchShift, Distortion, Clipping, LadderFilter
 from pedalboard.io import AudioFile
 import numpy as np
 from src.TTS.FilterPresetsType import FilterPresetsType
 from src.TTS.FilterPresets import FilterPresets
+from src.config import load_environment
+
+# Языки, голоса которых используются в игре
+available_voice_languages = frozenset(('ru-RU', 'en-US'))
+# Максимальное число голосов одного языка и пола в списке доступных голосов
+max_voices_per_group = 21
+# Имя голоса: код языка вида ru-RU, затем необязательное название голоса
+voice_name_pattern = re.compile(r"([a-z]{2,3}-[A-Z]{2})(?:-.+)?")
 
 class TextToSpeech:
     """!
@@ -17,20 +28,45 @@ class TextToSpeech:
     Использует Google Cloud Text-to-Speech API для синтеза речи из текста.
     Поддерживает различные голоса и языки.
     """
+    # Общий пул потоков для параллельных запросов синтеза (клиент gRPC потокобезопасен)
+    __executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="TextToSpeech")
+    processing_block_frames = 65536  # Размер блока (в отсчетах) при постобработке аудио
+    __shared_client: Optional[texttospeech.TextToSpeechClient] = None  # Общий для всех экземпляров клиент API
     
     def __init__(self):
         """!
         @brief Инициализация клиента Text-to-Speech
         """
-        load_dotenv()
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "key.json"
-
-        self.client = texttospeech.TextToSpeechClient()
+        self.client = self.__get_shared_client()
         self.voice_presets: Dict[str, Dict[str, Any]] = {}  # Хранение пресетов голосов
         
         # Инициализация пресетов фильтров
         self.filter_presets = FilterPresets.get_presets()
         
+        # Цепочки эффектов по ключу (pitch_shift, filter_preset); у каждого потока свои,
+        # так как плагины хранят внутреннее состояние во время обработки
+        self.__boards = threading.local()
+        
+        # Список голосов, полученный от API (не меняется в течение работы процесса)
+        self.__voices_cache: Optional[Dict[str, Dict[str, List[str]]]] = None
+        
+    @classmethod
+    def __get_shared_client(cls) -> texttospeech.TextToSpeechClient:
+        """!
+        @brief Получение общего клиента Text-to-Speech
+        
+        @details
+        Клиент (gRPC-канал и учетные данные) создается один раз на процесс
+        и переиспользуется всеми экземплярами синтезатора.
+        
+        @return texttospeech.TextToSpeechClient Клиент Google Cloud Text-to-Speech
+        """
+        if cls.__shared_client is None:
+            load_environment()
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "key.json"
+            cls.__shared_client = texttospeech.TextToSpeechClient()
+        return cls.__shared_client
+
     def synthesize_text(self, text: str, output_file: str, voice_name: str = "ru-RU-Chirp3-HD-Orus", 
                         pitch_shift: Optional[float] = None,
                         filter_preset: FilterPresetsType = FilterPresetsType.NONE) -> bool:
@@ -56,11 +92,11 @@ class TextToSpeech:
                 return False
             
             # Извлекаем код языка из имени голоса (например, ru-RU из ru-RU-Standard-A)
-            language_code = voice_name.split('-')[:2]
-            if len(language_code) < 2:
+            voice_match = voice_name_pattern.fullmatch(voice_name)
+            if voice_match is None:
                 logging.error(f"Некорректное имя голоса: {voice_name}")
                 return False
-            language_code = f"{language_code[0]}-{language_code[1]}"
+            language_code = voice_match.group(1)
             
             # Настройка параметров синтеза
             try:
@@ -89,27 +125,17 @@ class TextToSpeech:
                 logging.error(f"Ошибка при синтезе речи: {str(e)}")
                 return False
             
-            # Сохранение аудио во временный файл
-            temp_file = output_file
-            try:
-                with open(temp_file, "wb") as out:
-                    out.write(response.audio_content)
-                logging.info(f"Аудио успешно сохранено во временный файл {temp_file}")
-            except Exception as e:
-                logging.error(f"Ошибка при сохранении временного аудио файла: {str(e)}")
-                return False
-            
-            # Применяем постобработку
+            # Сохранение аудио с постобработкой (аудио декодируется только при наличии эффектов)
             try:
                 self._apply_post_processing(
-                    temp_file, 
+                    response.audio_content,
                     output_file,
                     pitch_shift,
                     filter_preset
                 )
-                logging.info(f"Постобработка успешно применена, результат сохранен в {output_file}")
+                logging.info(f"Аудио успешно сохранено в {output_file}")
             except Exception as e:
-                logging.error(f"Ошибка при постобработке аудио: {str(e)}")
+                logging.error(f"Ошибка при сохранении аудио: {str(e)}")
                 return False
             
             return True
@@ -118,60 +144,123 @@ class TextToSpeech:
             logging.error(f"Неожиданная ошибка при синтезе речи: {str(e)}")
             return False
     
-    def _apply_post_processing(self, input_file: str, output_file: str, 
+    def synthesize_batch(self, requests: List[Tuple[str, str, str, Optional[float], FilterPresetsType]]) -> List[bool]:
+        """!
+        @brief Параллельный синтез нескольких фрагментов речи
+        
+        @param requests Список кортежей (text, output_file, voice_name, pitch_shift, filter_preset),
+            параметры которых совпадают с параметрами synthesize_text
+        
+        @return List[bool] Результаты synthesize_text в порядке запросов
+        
+        @details
+        Запросы к API выполняются одновременно, поэтому общее время синтеза
+        определяется самым долгим запросом, а не их суммой.
+        """
+        return list(self.__executor.map(lambda request: self.synthesize_text(*request), requests))
+
+    def __get_board(self, pitch_shift: Optional[float],
+                    filter_preset: FilterPresetsType) -> Optional[Pedalboard]:
+        """!
+        @brief Получение цепочки эффектов для заданных параметров
+        
+        @param pitch_shift Сдвиг высоты тона в полутонах
+        @param filter_preset Пресет фильтра для постобработки
+        
+        @return Optional[Pedalboard] Цепочка эффектов или None, если эффекты не нужны
+        
+        @details
+        Цепочка создается один раз для каждой пары параметров в каждом потоке
+        """
+        if not hasattr(self.__boards, 'cache'):
+            self.__boards.cache = {}
+        cache: Dict[Tuple[Optional[float], FilterPresetsType], Optional[Pedalboard]] = self.__boards.cache
+        key = (pitch_shift, filter_preset)
+        if key not in cache:
+            effects = []
+            
+            # Добавляем эффекты только если указаны соответствующие параметры
+            if pitch_shift:
+                effects.append(PitchShift(semitones=pitch_shift))
+            
+            # Применяем фильтр на основе пресета
+            if filter_preset != FilterPresetsType.NONE and filter_preset in self.filter_presets:
+                preset = self.filter_presets[filter_preset]
+                effects.append(LadderFilter(
+                    mode=preset['mode'],
+                    cutoff_hz=preset['cutoff_hz'],
+                    resonance=preset['resonance'],
+                    drive=preset['drive']
+                ))
+            
+            cache[key] = Pedalboard(effects) if effects else None
+        return cache[key]
+
+    def _apply_post_processing(self, audio_content: bytes, output_file: str, 
                               pitch_shift: Optional[float] = None,
                               filter_preset: FilterPresetsType = FilterPresetsType.NONE
                               ) -> None:
         """!
-        @brief Применение постобработки к аудиофайлу
+        @brief Применение постобработки к синтезированному аудио и сохранение в файл
         
-        @param input_file Путь к входному аудиофайлу
+        @param audio_content MP3-данные, полученные от Text-to-Speech API
         @param output_file Путь для сохранения обработанного аудиофайла
         @param pitch_shift Сдвиг высоты тона в полутонах
         @param filter_preset Пресет фильтра для постобработки
-        @param distortion_amount Количество искажений
+        
+        @details
+        Если эффекты не нужны, данные записываются в файл как есть.
+        Иначе аудио декодируется из памяти, без промежуточного файла.
+        Цепочки без задержки обрабатываются блоками по processing_block_frames отсчетов,
+        цепочки с PitchShift - одним вызовом.
         """
-        # Загрузка аудио
-        with AudioFile(input_file, 'r') as f:
-            audio = f.read(f.frames)
-            sr = f.samplerate
-        
-        # Создание цепочки эффектов
-        effects = []
-        
-        # Добавляем эффекты только если указаны соответствующие параметры
-        if pitch_shift is not None:
-            effects.append(PitchShift(semitones=pitch_shift))
-        
-        # Применяем фильтр на основе пресета
-        if filter_preset != FilterPresetsType.NONE and filter_preset in self.filter_presets:
-            preset = self.filter_presets[filter_preset]
-            effects.append(LadderFilter(
-                mode=preset['mode'],
-                cutoff_hz=preset['cutoff_hz'],
-                resonance=preset['resonance'],
-                drive=preset['drive']
-            ))
-        
-        
-        # Если есть эффекты, применяем их
-        if effects:
-            board = Pedalboard(effects)
-            processed = board.process(audio, sr)
+        board = self.__get_board(pitch_shift, filter_preset)
+        
+        # Если эффекты не указаны, сохраняем полученные данные без перекодирования
+        if board is None:
+            with open(output_file, "wb") as out:
+                out.write(audio_content)
+            return
+        
+        with AudioFile(BytesIO(audio_content), 'r') as f_in:
+            # PitchShift вносит задержку: при обработке блоками с reset=False он теряет
+            # задержанный конец и части сигнала, поэтому аудио обрабатывается целиком,
+            # тогда Pedalboard сам компенсирует задержку и длина результата совпадает с исходной
+            if any(isinstance(plugin, PitchShift) for plugin in board):
+                audio = self.__read_block(f_in, f_in.frames)
+                processed = board.process(audio, f_in.samplerate, reset=True)
+                with AudioFile(output_file, 'w', f_in.samplerate, f_in.num_channels) as f_out:
+                    f_out.write(processed)
+                return
             
-            # Сохранение результата
-            with AudioFile(output_file, 'w', sr, processed.shape[0]) as f:
-                f.write(processed)
-        else:
-            # Если эффекты не указаны, просто копируем файл
-            with AudioFile(input_file, 'r') as f_in:
-                with AudioFile(output_file, 'w', f_in.samplerate, f_in.frames) as f_out:
-                    f_out.write(f_in.read(f_in.frames))
+            # Обработка аудио блоками: в памяти одновременно находится только один блок
+            board.reset()
+            chunk = self.__read_block(f_in, self.processing_block_frames)
+            with AudioFile(output_file, 'w', f_in.samplerate, f_in.num_channels) as f_out:
+                while True:
+                    f_out.write(board.process(chunk, f_in.samplerate, reset=False))
+                    if f_in.tell() >= f_in.frames:
+                        break
+                    chunk = self.__read_block(f_in, self.processing_block_frames)
+
+    @staticmethod
+    def __read_block(audio_file: AudioFile, frames: int) -> np.ndarray:
+        """!
+        @brief Чтение очередного блока аудио
+        
+        @param audio_file Открытый для чтения аудиофайл
+        @param frames Число отсчетов в блоке
+        
+        @return np.ndarray Блок размера (каналы, отсчеты) в формате float32, непрерывный в памяти
+        """
+        return np.ascontiguousarray(audio_file.read(frames), dtype=np.float32)
 
-    def get_available_voices(self) -> Dict[str, Dict[str, List[str]]]:
+    def get_available_voices(self, refresh: bool = False) -> Dict[str, Dict[str, List[str]]]:
         """!
         @brief Получение списка доступных голосов
         
+        @param refresh Запросить список у API заново, даже если он уже получен
+        
         @return Dict[str, Dict[str, List[str]]] Словарь с доступными голосами в формате:
             {
                 "en": {
@@ -183,7 +272,11 @@ class TextToSpeech:
                     "female": ["ru-RU-4", "ru-RU-5", ...]
                 }
             }
+        
+        @note Успешный ответ API сохраняется и возвращается при следующих вызовах
         """
+        if self.__voices_cache is not None and not refresh:
+            return self.__voices_cache
         try:
             # Получаем список всех доступных голосов
             response = self.client.list_voices()
@@ -193,23 +286,31 @@ class TextToSpeech:
                 "en": {"male": [], "female": []},
                 "ru": {"male": [], "female": []}
             }
-            available_languages = set(['ru-RU','en-US'])
+            male = texttospeech.SsmlVoiceGender.MALE
+            groups_left = sum(len(genders) for genders in voices.values())
             
             # Обрабатываем каждый голос
             for voice in response.voices:
                 # Проверяем, что голос поддерживает синтез речи
-                if not voice.ssml_gender:
+                ssml_gender = voice.ssml_gender
+                if not ssml_gender:
                     continue
-                if voice.language_codes[0] not in available_languages:
+                full_language_code = voice.language_codes[0]
+                if full_language_code not in available_voice_languages:
                     continue
 
                 # Получаем код языка и пол
-                language_code = voice.language_codes[0][:2]
-                gender = "male" if voice.ssml_gender == texttospeech.SsmlVoiceGender.MALE else "female"
-                if len(voices[language_code][gender]) > 20:
+                group = voices[full_language_code[:2]]["male" if ssml_gender == male else "female"]
+                if len(group) >= max_voices_per_group:
                     continue
-                voices[language_code][gender].append(voice.name)
+                group.append(voice.name)
+                if len(group) == max_voices_per_group:
+                    groups_left -= 1
+                    # Все группы заполнены, остальные голоса не нужны
+                    if groups_left == 0:
+                        break
                 
+            self.__voices_cache = voices
             return voices
             
         except Exception as e:
@@ -24,5 +24,6 @@ def modify_voice_pedalboard(input_path, output_path):
     with AudioFile(output_path, 'w', sr, processed.shape[0]) as f:
         f.write(processed)
 
-# Использование:
-modify_voice_pedalboard("test.mp3", "output_pedalboard.mp3")
\ No newline at end of file
+if __name__ == "__main__":
+    # Использование:
+    modify_voice_pedalboard("test.mp3", "output_pedalboard.mp3")
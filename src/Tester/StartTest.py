@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List
+from concurrent.futures import ThreadPoolExecutor, Future
 from src.SessionManager.SessionManager import SessionManager
 from src.GamePresets.GamePresets import GamePresets, GameWorld, GameCharacter
 from src.Tester.Tester import Tester
 from src.GameManager.GameManager import GameManager
 from src.DatabaseManager.DatabaseManager import DatabaseManager
 from src.NaiveModel.NaiveModel import NaiveModel
+from src.LogManager.LogManager import setup_logging
 
 # Параметры теста
 TEST_PARAMETERS = {
@@ -27,6 +29,10 @@ def run_test(session_id: int, iterations: int, generate_images: bool, generate_s
     @param generate_images Флаг генерации изображений
     @param generate_sound Флаг генерации звука
     @param use_naive_model Флаг использования наивной модели вместо GameManager
+    
+    @details
+    Озвучка ответов GameManager выполняется в фоновом потоке, пока тестер генерирует
+    следующую реплику. Перед завершением теста ожидается готовность всех аудиофайлов.
     """
     # Создаем тестер и менеджер игры
     tester = Tester(session_id)
@@ -43,19 +49,23 @@ def run_test(session_id: int, iterations: int, generate_images: bool, generate_s
     if session_info is None:
         raise ValueError(f"Session {session_id} not found")
     
-    _, _, language, initial_message, _ = session_info
-    
     # Отправляем начальное сообщение
-    print(f"\nInitial message ({language}):")
-    print(initial_message)
+    print(f"\nInitial message ({session_info.language}):")
+    print(session_info.initial_message)
     print("-"*30)
     
     # Генерируем ответ на начальное сообщение
-    response = tester.get_actor_response(initial_message)
+    response = tester.get_actor_response(session_info.initial_message)
     print("\nModel response:")
     print(response)
     print("-"*30)
     
+    # Озвучка выполняется последовательно в одном фоновом потоке, параллельно с диалогом
+    audio_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TestAudio")
+    audio_jobs: List[Future[Optional[str]]] = []
+    # Каждый вызов process_input добавляет одно сообщение, поэтому история читается из базы один раз
+    message_count = len(DatabaseManager().get_user_messages(session_id)) if not use_naive_model else 0
+    
     # Основной цикл теста
     for i in range(iterations):
         print(f"\nIteration {i+1}/{iterations}")
@@ -64,7 +74,11 @@ def run_test(session_id: int, iterations: int, generate_images: bool, generate_s
         if use_naive_model:
             narrative_response, _ = naive_model.generate_response(response)
         else:
-            narrative_response, _, _ = game_manager.process_input(response, generate_images, generate_sound)
+            narrative_response, _, _ = game_manager.process_input(response, generate_images, False)
+            message_count += 1
+            if generate_sound:
+                # generate_audio озвучивает сообщение с номером sequence + 1
+                audio_jobs.append(audio_executor.submit(game_manager.generate_audio, message_count - 1))
         
         print("\nNarrative response:")
         print(narrative_response)
@@ -74,6 +88,11 @@ def run_test(session_id: int, iterations: int, generate_images: bool, generate_s
         print(response)
         print("-"*30)
     
+    # Дожидаемся озвучки всех ответов
+    for job in audio_jobs:
+        job.result()
+    audio_executor.shutdown()
+    
     print("\nTest completed!")
     print("="*50)
 
@@ -82,6 +101,7 @@ def main() -> None:
     """!
     @brief Основная функция
     """
+    setup_logging()
     try:
         # Создаем менеджер сессий
         
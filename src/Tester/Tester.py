@@ -1,9 +1,51 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from functools import lru_cache
 from src.DatabaseManager.DatabaseManager import DatabaseManager
 from src.MessageGenerator.BaseMessageGenerator import get_base_message_generator, RequesterClass
 from src.GamePresets.GamePresets import GamePresets, GameWorld, GameCharacter
 
 
+# Шаблон системного промпта тестера, заполняется данными сессии
+initial_prompt_template = """
+            You're posing as a user-player in a role-playing game to test it. 
+            The player, (that is, you) plays a certain character, its description will be given below. 
+            You will receive information from the game in the text messages.   
+            These messages reflect what happened in the game. As a player, you need to react to them somehow.
+            The reaction should be the action your character is trying to do.         
+            Game World:
+            {world}
+
+            Your Character:
+            {player}
+
+            Instructions:
+            1. Stay in character at all times
+            2. Maintain consistency with the game world's setting
+            3. All answers must contain an action performed by your character.
+            4. Do not break character or acknowledge being an AI
+            5. Do not use meta-commentary about the game or role-playing
+            6. Answer briefly 2-3 sentences.
+
+            Begin the conversation in character.
+            Important: All your responses must be in {language} language.
+
+            """
+
+
+@lru_cache(maxsize=64)
+def build_initial_prompt(world: str, player: str, language: str) -> str:
+    """!
+    @brief Построение системного промпта тестера
+    
+    @param world Описание игрового мира
+    @param player Описание персонажа игрока
+    @param language Язык ответов
+    
+    @return str Промпт; для одинаковых параметров возвращается одна и та же строка
+    """
+    return initial_prompt_template.format_map({'world': world, 'player': player, 'language': language})
+
+
 class Tester:
     """!
     @brief Класс для тестирования диалогов
@@ -26,48 +68,22 @@ class Tester:
         if session_info is None:
             raise ValueError(f"Session {session_id} not found")
             
-        world_description, player_description, language, _ , _ = session_info
-        
         # Создаем генератор сообщений
         self.message_generator = get_base_message_generator(RequesterClass.Tester)
         
         # Формируем начальный промпт
-        initial_prompt = f"""
-            You're posing as a user-player in a role-playing game to test it. 
-            The player, (that is, you) plays a certain character, its description will be given below. 
-            You will receive information from the game in the text messages.   
-            These messages reflect what happened in the game. As a player, you need to react to them somehow.
-            The reaction should be the action your character is trying to do.         
-            Game World:
-            {world_description}
-
-            Your Character:
-            {player_description}
-
-            Instructions:
-            1. Stay in character at all times
-            2. Maintain consistency with the game world's setting
-            3. All answers must contain an action performed by your character.
-            4. Do not break character or acknowledge being an AI
-            5. Do not use meta-commentary about the game or role-playing
-            6. Answer briefly 2-3 sentences.
-
-            Begin the conversation in character.
-            Important: All your responses must be in {language} language.
-
-            """
+        initial_prompt = build_initial_prompt(session_info.world_description, session_info.player_description,
+                                              session_info.language)
         
         # Добавляем системное сообщение с полным промптом
         self.message_generator.add_system_message(initial_prompt)
         
-        # Загружаем историю сообщений в генератор
-        user_messages = self.db.get_user_messages(session_id)
-        actor_messages = self.db.get_actor_messages(session_id)
-        
-        # Загружаем историю диалога в генератор
-        for user_msg, actor_msg in zip(user_messages, actor_messages):
-            self.message_generator.add_ai_message(user_msg)
-            self.message_generator.add_user_message(actor_msg)
+        # Загружаем историю диалога в генератор: реплики игрока - ответы тестера, ответы игры - входящие сообщения
+        history: List[Tuple[str, str]] = []
+        for user_input, response in self.db.get_dialog_history(session_id):
+            history.append(('assistant', user_input))
+            history.append(('user', response))
+        self.message_generator.extend_history(history)
 
     def get_actor_response(self, message: str) -> str:
         """!
@@ -16,6 +16,7 @@ from src.SessionManager.SessionManager import SessionManager
 from src.Actor.Actor import Actor
 from src.GameMaster.GameMaster import GameMaster
 from src.GameManager.GameManager import GameManager
+from src.LogManager.LogManager import setup_logging
 
 
 def run_mypy() -> None:
@@ -105,6 +106,7 @@ def select_language() -> str:
 
 
 def main() -> None:
+    setup_logging()
     manager = SessionManager()
     
     user_id = select_user(manager)
@@ -117,9 +119,8 @@ def main() -> None:
     game_manager = GameManager(session_id)
     try:
 
-        sessions = manager.db.get_user_sessions(user_id)
-        session_id = int(session_id)
-        if any(session_id == existing_id for existing_id, _, _, _ in sessions):
+        # select_session returns only sessions of this user, so history exists only for a resumed one
+        if not is_new:
             print("\nMessage History:")
             print("="*50)
             
@@ -150,5 +151,7 @@ def main() -> None:
         print("\n" + "="*50)
 
 if __name__ == "__main__":
-    run_mypy()
+    # Проверка типов нужна только при разработке: RUN_MYPY=1 python -m src
+    if os.environ.get("RUN_MYPY"):
+        run_mypy()
     main()
@@ -1,3 +1,17 @@
+from functools import cache
+from dotenv import load_dotenv
 
 DATABASE_NAME = "main.db" 
-IMAGE_OUTPUT_DIR = 'images'
\ No newline at end of file
+IMAGE_OUTPUT_DIR = 'images'
+LOG_FILE = 'game_master.log'
+
+
+@cache
+def load_environment() -> None:
+    """!
+    @brief Загрузка переменных окружения из файла .env
+    
+    @details
+    Файл читается один раз на процесс, повторные вызовы ничего не делают.
+    """
+    load_dotenv()
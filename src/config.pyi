@@ -1,2 +1,5 @@
 DATABASE_NAME: str 
-IMAGE_OUTPUT_DIR: str
\ No newline at end of file
+IMAGE_OUTPUT_DIR: str
+LOG_FILE: str
+
+def load_environment() -> None: ...